@@ -0,0 +1,200 @@
+"""
+A local stand-in for the parts of the OpenAI API the backend uses.
+
+It serves `POST /v1/embeddings` and `POST /v1/responses`, including structured outputs
+(`responses.parse`) and streaming. Embeddings are deterministic unit vectors derived from a hash
+of the input, so the same text always gets the same vector. Each call sleeps for a configurable
+latency before answering, so benchmarks measure our request path rather than OpenAI's network.
+
+Usage:
+    python -m benchmarks.fake_openai --port 9100 --llm-latency-ms 300 --embedding-latency-ms 30
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 OPENAI_API_KEY=fake uvicorn main:app
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+INSURANCE_WORDS = re.compile(r'\b(insurance|plan|plans|deductible|copay|coinsurance|coverage|covered|hsa|premium|hospital|prescription|network)\b', re.I)
+
+
+def fake_embedding(value: Any, dimension: int) -> np.ndarray:
+    """Return a deterministic unit vector for a text or a list of token ids."""
+    seed = hashlib.sha256(json.dumps(value).encode('utf-8')).digest()
+    vector = np.random.default_rng(int.from_bytes(seed[:8], 'little')).standard_normal(dimension).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _input_text(body: Dict[str, Any]) -> str:
+    """Return the text of every input message of a responses request."""
+    items = body.get("input")
+    if isinstance(items, str):
+        return items
+    texts = []
+    for item in items or []:
+        content = item.get("content")
+        if isinstance(content, str):
+            texts.append(content)
+        else:
+            texts.extend(part.get("text", "") for part in content or [])
+    return "\n".join(texts)
+
+
+def _fake_structured_output(schema: Dict[str, Any], prompt: str) -> Dict[str, Any]:
+    """Fill a JSON schema with plausible values; booleans answer the routing question by keyword."""
+    values = {}
+    for name, field in schema.get("properties", {}).items():
+        kind = field.get("type")
+        if kind == "boolean":
+            query = prompt.split("Query:", 1)[-1].split("Instructions:", 1)[0]
+            values[name] = not INSURANCE_WORDS.search(query)
+        elif kind in ("integer", "number"):
+            values[name] = 0
+        elif kind == "array":
+            values[name] = []
+        else:
+            values[name] = ""
+    return values
+
+
+def _response(model: str, text: str, input_tokens: int, status: str = "completed") -> Dict[str, Any]:
+    return {
+        "id": f"resp_{uuid.uuid4().hex}",
+        "object": "response",
+        "created_at": int(time.time()),
+        "model": model,
+        "status": status,
+        "output": [{
+            "type": "message",
+            "id": f"msg_{uuid.uuid4().hex}",
+            "status": status,
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": text, "annotations": []}] if text else [],
+        }],
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "usage": {
+            "input_tokens": input_tokens,
+            "input_tokens_details": {"cached_tokens": 0},
+            "output_tokens": len(text.split()),
+            "output_tokens_details": {"reasoning_tokens": 0},
+            "total_tokens": input_tokens + len(text.split()),
+        },
+    }
+
+
+def create_app(
+    llm_latency: float = 0.3,
+    embedding_latency: float = 0.03,
+    stream_chunks: int = 20,
+    dimension: int = 1536,
+) -> FastAPI:
+    """
+    Build the stand-in server.
+
+    Args:
+        llm_latency (float): Seconds before a response is returned, or spread over a stream
+        embedding_latency (float): Seconds before an embeddings response is returned
+        stream_chunks (int): Number of text deltas in a streamed response
+        dimension (int): Dimension of the returned embeddings
+    """
+    app = FastAPI()
+    answer_words = ("This is a generated answer from the local OpenAI stand-in used for benchmarks. " * 4).split()
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body["input"]
+        # A single input may be a string or a list of token ids.
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        await asyncio.sleep(embedding_latency)
+
+        data = []
+        for i, value in enumerate(inputs):
+            vector = fake_embedding(value, body.get("dimensions") or dimension)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.astype('<f4').tobytes()).decode('ascii')
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(value) if isinstance(value, list) else len(value.split()) for value in inputs)
+        return {"object": "list", "data": data, "model": body.get("model", ""), "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    @app.post("/v1/responses")
+    async def responses(request: Request):
+        body = await request.json()
+        model = body.get("model", "")
+        prompt = _input_text(body)
+        input_tokens = len(prompt.split())
+        text_format = (body.get("text") or {}).get("format") or {}
+        if text_format.get("type") == "json_schema":
+            text = json.dumps(_fake_structured_output(text_format.get("schema", {}), prompt))
+        else:
+            text = " ".join(answer_words)
+
+        if not body.get("stream"):
+            await asyncio.sleep(llm_latency)
+            return _response(model, text, input_tokens)
+
+        async def events() -> AsyncIterator[str]:
+            response = _response(model, "", input_tokens, status="in_progress")
+            item_id = response["output"][0]["id"]
+            sequence = 0
+
+            def event(payload: Dict[str, Any]) -> str:
+                nonlocal sequence
+                payload["sequence_number"] = sequence
+                sequence += 1
+                return f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n"
+
+            yield event({"type": "response.created", "response": response})
+            words = text.split(" ")
+            size = max(1, -(-len(words) // stream_chunks))
+            for start in range(0, len(words), size):
+                await asyncio.sleep(llm_latency / stream_chunks)
+                delta = " ".join(words[start:start + size]) + (" " if start + size < len(words) else "")
+                yield event({
+                    "type": "response.output_text.delta",
+                    "item_id": item_id,
+                    "output_index": 0,
+                    "content_index": 0,
+                    "delta": delta,
+                    "logprobs": [],
+                })
+            completed = _response(model, text, input_tokens)
+            completed["id"] = response["id"]
+            yield event({"type": "response.completed", "response": completed})
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the OpenAI API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=30.0)
+    parser.add_argument("--stream-chunks", type=int, default=20)
+    parser.add_argument("--dimension", type=int, default=1536)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.llm_latency_ms / 1000, args.embedding_latency_ms / 1000, args.stream_chunks, args.dimension),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
@@ -0,0 +1,55 @@
+"""
+Compare FAQ extraction throughput of the selector-based and lxml extractors.
+
+Every page of the scraped content file is extracted with the current selector-based
+extractor, with the single-walk lxml extractor, and with the lxml extractor across a process
+pool. For each it reports pages per second, and it checks that every page's output is identical
+to the selector-based extractor's. Pages are repeated `--repeat` times to get stable timings.
+
+Usage:
+    python -m benchmarks.faq_extraction_benchmark --repeat 5 --workers 4
+"""
+import argparse
+import os
+import time
+from typing import Callable, Dict, List
+
+from data_processing.extract_faq_pairs import (
+    LEGACY_INPUT_FILE,
+    extract_faq_pairs_from_html,
+    extract_faq_pairs_lxml,
+    extract_pages,
+    iter_content_records,
+)
+
+
+def _time(name: str, extract: Callable[[List[Dict]], List[List[Dict[str, str]]]], records: List[Dict], expected: List[List[Dict[str, str]]]) -> None:
+    start = time.perf_counter()
+    results = extract(records)
+    elapsed = time.perf_counter() - start
+    mismatches = sum(result != reference for result, reference in zip(results, expected))
+    print(f"  {name:22s} {len(records) / elapsed:9.1f} pages/s  {elapsed:7.3f}s  mismatched pages: {mismatches}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=LEGACY_INPUT_FILE)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    records = [record for record in iter_content_records(args.input) if record.get('content')] * args.repeat
+    print(f"{args.input}: {len(records)} pages ({args.repeat} passes)")
+
+    start = time.perf_counter()
+    expected = [extract_faq_pairs_from_html(record['content']) for record in records]
+    elapsed = time.perf_counter() - start
+    print(f"  {'selectors':22s} {len(records) / elapsed:9.1f} pages/s  {elapsed:7.3f}s")
+
+    _time("lxml", lambda pages: [extract_faq_pairs_lxml(page['content']) for page in pages], records, expected)
+    _time(
+        f"lxml, {args.workers} processes",
+        lambda pages: [faq_pairs for _, faq_pairs in extract_pages(pages, args.workers)],
+        records,
+        expected,
+    )
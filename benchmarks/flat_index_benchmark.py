@@ -0,0 +1,77 @@
+"""
+Compare retrieval latency and recall@10 of the flat NumPy index against Chroma.
+
+Queries are stored vectors with Gaussian noise added, so the benchmark runs offline without
+calling OpenAI. Exact brute-force top-k over the float32 vectors is the ground truth. Chroma
+ranks by L2 distance, which gives the same order as cosine similarity for OpenAI's unit-norm
+embeddings.
+
+Usage:
+    python -m rag.flat_index                      # export the flat indexes first
+    python -m benchmarks.flat_index_benchmark --queries 200 --noise 0.02
+"""
+import argparse
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+from langchain_chroma import Chroma
+
+from rag.flat_index import load_flat_index
+
+
+def _percentile(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def _run(search: Callable[[List[float]], List[str]], queries: np.ndarray, truth: List[List[str]], k: int) -> Dict[str, float]:
+    latencies = []
+    recalls = []
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = search(query.tolist())
+        latencies.append(1000 * (time.perf_counter() - start))
+        recalls.append(len(set(found[:k]) & set(expected)) / len(expected))
+    return {
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+    }
+
+
+def benchmark(persist_directory: str, num_queries: int, noise: float, k: int, seed: int) -> None:
+    chroma = Chroma(persist_directory=persist_directory)
+    flat = load_flat_index(persist_directory)
+    flat_int8 = load_flat_index(persist_directory, quantized=True)
+
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(flat.vectors.shape[0], size=min(num_queries, flat.vectors.shape[0]), replace=False)
+    queries = np.asarray(flat.vectors[rows]) + rng.normal(scale=noise, size=(len(rows), flat.vectors.shape[1])).astype(np.float32)
+
+    exact = np.asarray(flat.vectors)
+    truth = []
+    for query in queries:
+        scores = exact @ (query / np.linalg.norm(query))
+        truth.append([flat.ids[row] for row in np.argsort(-scores)[:k]])
+
+    def search_chroma(embedding: List[float]) -> List[str]:
+        return chroma._collection.query(query_embeddings=[embedding], n_results=k, include=[])["ids"][0]
+
+    def search_flat(index):
+        return lambda embedding: [index.ids[row] for row in index.search(embedding, k)]
+
+    print(f"{persist_directory}: {flat.vectors.shape[0]} vectors, {len(queries)} queries")
+    for name, search in (("chroma", search_chroma), ("flat", search_flat(flat)), ("flat-int8", search_flat(flat_int8))):
+        print(f"  {name:10s} {_run(search, queries, truth, k)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for directory in ("data/vector_store_angelone", "data/vector_store_insurance"):
+        benchmark(directory, args.queries, args.noise, args.k, args.seed)
@@ -0,0 +1,158 @@
+"""
+Check incremental recrawls against a local stand-in for the AngelOne support site.
+
+The stand-in serves the pages of the scraped content file from localhost with ETag and
+Last-Modified headers, and answers conditional requests with 304 when a page has not changed.
+The run crawls every page once, then modifies the site:
+- `--changed` of the pages get new FAQ content,
+- `--cosmetic` of the pages change outside `.list-content` only, so they are sent again but
+  hash the same,
+- `--failing` of the pages answer 500.
+It then recrawls incrementally and re-extracts the FAQ pairs. It prints the changed, unchanged
+and failed counts next to what the modifications should produce, and the time of both passes.
+
+Usage:
+    python -m benchmarks.incremental_crawl --pages 200 --changed 0.1 --cosmetic 0.05 --failing 0.02
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from email.utils import formatdate
+from typing import Dict, List
+
+from fastapi import FastAPI, Request, Response
+
+from benchmarks.load_test import _serve
+from data_processing.extract_faq_pairs import LEGACY_INPUT_FILE, iter_content_records, process_content_file
+
+
+class SupportSite:
+    """Pages served by the stand-in, with the validators of their current version."""
+
+    def __init__(self, contents: List[str], validators: str = "both"):
+        self.validators = validators
+        self.pages: Dict[str, Dict[str, str]] = {}
+        self.failing = set()
+        for i, content in enumerate(contents):
+            self.set_page(f"/support/page-{i}", content, footer="")
+
+    def set_page(self, path: str, content: str, footer: str) -> None:
+        body = f"<html><body>{content}<footer>{footer}</footer></body></html>"
+        self.pages[path] = {
+            "content": content,
+            "body": body,
+            "etag": '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:16] + '"',
+            "last_modified": formatdate(time.time(), usegmt=True),
+        }
+
+    def create_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/support/{name}")
+        async def page(name: str, request: Request):
+            path = f"/support/{name}"
+            if path in self.failing:
+                return Response(status_code=500)
+            if path not in self.pages:
+                return Response(status_code=404)
+            page = self.pages[path]
+            headers = {}
+            if self.validators in ("both", "etag"):
+                headers["ETag"] = page["etag"]
+            if self.validators in ("both", "last-modified"):
+                headers["Last-Modified"] = page["last_modified"]
+            if headers.get("ETag") and request.headers.get("if-none-match") == page["etag"]:
+                return Response(status_code=304, headers=headers)
+            if "ETag" not in headers and headers.get("Last-Modified") and request.headers.get("if-modified-since") == page["last_modified"]:
+                return Response(status_code=304, headers=headers)
+            return Response(page["body"], media_type="text/html", headers=headers)
+
+        return app
+
+
+def crawl(workdir: str, port: int, incremental: bool) -> Dict[str, float]:
+    """Run the content fetcher in a subprocess and count its output records."""
+    command = [
+        sys.executable, "-m", "data_processing.scraper",
+        "--input", os.path.join(workdir, "urls.txt"),
+        "--output", os.path.join(workdir, "content.jsonl"),
+        "--state", os.path.join(workdir, "crawl_state.json"),
+        "--feed", os.path.join(workdir, "feed.json"),
+        "--allowed-domains", "127.0.0.1",
+        "--download-delay", "0",
+    ]
+    if incremental:
+        command.append("--incremental")
+    start = time.perf_counter()
+    subprocess.run(command, check=True, capture_output=True)
+    counts = {"seconds": time.perf_counter() - start, "changed": 0, "unchanged": 0, "failed": 0}
+    for record in iter_content_records(os.path.join(workdir, "content.jsonl")):
+        counts["failed" if "error" in record else "unchanged" if record.get("unchanged") else "changed"] += 1
+    return counts
+
+
+def extract(workdir: str) -> float:
+    start = time.perf_counter()
+    process_content_file(os.path.join(workdir, "content.jsonl"), os.path.join(workdir, "faq_pairs.json"))
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=LEGACY_INPUT_FILE, help="Scraped content file the stand-in serves")
+    parser.add_argument("--pages", type=int, default=0, help="Serve at most this many pages (0 for all)")
+    parser.add_argument("--changed", type=float, default=0.1, help="Fraction of pages whose FAQ content changes")
+    parser.add_argument("--cosmetic", type=float, default=0.05, help="Fraction of pages that change outside .list-content")
+    parser.add_argument("--failing", type=float, default=0.02, help="Fraction of pages that fail on the recrawl")
+    parser.add_argument("--validators", choices=["both", "etag", "last-modified", "none"], default="both")
+    parser.add_argument("--port", type=int, default=9200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Directory for the crawl files; a temporary one by default")
+    args = parser.parse_args()
+
+    contents = [record["content"] for record in iter_content_records(args.input) if record.get("content")]
+    if args.pages:
+        contents = contents[:args.pages]
+    site = SupportSite(contents, args.validators)
+    _serve(site.create_app(), args.port)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="incremental_crawl_")
+    os.makedirs(workdir, exist_ok=True)
+    with open(os.path.join(workdir, "urls.txt"), 'w') as f:
+        f.writelines(f"http://127.0.0.1:{args.port}{path}\n" for path in site.pages)
+    for name in ("crawl_state.json", "faq_pairs.json"):
+        if os.path.exists(os.path.join(workdir, name)):
+            os.remove(os.path.join(workdir, name))
+
+    full = crawl(workdir, args.port, incremental=False)
+    full["extract_seconds"] = extract(workdir)
+
+    paths = list(site.pages)
+    random.Random(args.seed).shuffle(paths)
+    n_changed, n_cosmetic, n_failing = (round(fraction * len(paths)) for fraction in (args.changed, args.cosmetic, args.failing))
+    for path in paths[:n_changed]:
+        # The content is the .list-content element, so the edit goes before its closing tag.
+        content = site.pages[path]["content"]
+        end = content.rfind("</")
+        site.set_page(path, content[:end] + "<p>Updated.</p>" + content[end:], footer="")
+    for path in paths[n_changed:n_changed + n_cosmetic]:
+        site.set_page(path, site.pages[path]["content"], footer=f"Rendered at {time.time()}")
+    site.failing = set(paths[n_changed + n_cosmetic:n_changed + n_cosmetic + n_failing])
+
+    recrawl = crawl(workdir, args.port, incremental=True)
+    recrawl["extract_seconds"] = extract(workdir)
+
+    expected = {"changed": n_changed, "unchanged": len(paths) - n_changed - n_failing, "failed": n_failing}
+    print(f"\n{len(paths)} pages, files in {workdir}")
+    print(f"{'':12s} {'changed':>8} {'unchanged':>10} {'failed':>7} {'crawl s':>8} {'extract s':>10}")
+    for name, row in (("full crawl", full), ("recrawl", recrawl), ("expected", expected)):
+        print(
+            f"{name:12s} {row['changed']:>8} {row['unchanged']:>10} {row['failed']:>7} "
+            f"{row.get('seconds', float('nan')):>8.2f} {row.get('extract_seconds', float('nan')):>10.2f}"
+        )
@@ -0,0 +1,110 @@
+"""
+Compare the insurance chunk schema that repeats plan details in every chunk with the normalized one.
+
+Reports, for both schemas, the number of chunks, the stored text size and the tokens sent to
+the embedding model, plus the average prompt tokens over a set of plan questions. Retrieval is
+approximated offline with word-overlap ranking, so no OpenAI calls are made. The number of
+vectors, and therefore the vector part of the index, is the same for both schemas.
+
+Usage:
+    python -m benchmarks.insurance_chunk_report
+"""
+import json
+import re
+from typing import Dict, List
+
+import tiktoken
+from langchain_core.documents import Document
+
+from rag.rag import generate_user_prompt
+from rag.vector_store import VectorStore
+
+
+def legacy_plan_documents(plans_path: str) -> List[Document]:
+    """Build the insurance chunks the way _load_plans did before plan details were normalized."""
+    with open(plans_path, 'r', encoding='utf-8') as f:
+        plans_data = json.load(f)
+
+    documents = []
+    for plan in plans_data:
+        plan_name = plan["plan details"]["plan name"]
+        for question_data in plan["important questions"]:
+            content = f"""Start of information for Plan: {plan_name}
+                "plan details": {plan["plan details"]["plan details"]}
+                "question": {question_data["question"]}
+                "answer": {question_data["answer"]}
+                "why it matters": {question_data["why it matters"]}
+                End of information for Plan: {plan_name}"""
+            documents.append(Document(page_content=content, metadata={"source": "plans", "type": "important_questions"}))
+        for event in plan["common medical events"]:
+            for service in event["services"]:
+                content = f"""Start of information for Plan: {plan_name}
+                    "plan details": {plan["plan details"]["plan details"]}
+                    "event": {event["event category"]}
+                    "service": {service["service name"]}
+                    "member out of pocket": {service["member out of pocket"]}
+                    "limitations and exceptions": {service["limitations and exceptions"]}
+                    End of information for Plan: {plan_name}"""
+                documents.append(Document(page_content=content, metadata={"source": "plans", "type": "medical_events"}))
+        excluded_services = ", ".join(plan["excluded services"])
+        other_covered = ", ".join(plan["other covered services"])
+        content = f"""Start of information for Plan: {plan_name}
+            "plan details": {plan["plan details"]["plan details"]}
+            The following services are excluded in the plan: {excluded_services}
+            Other covered services available with plan: {other_covered}
+            End of information for Plan: {plan_name}"""
+        documents.append(Document(page_content=content, metadata={"source": "plans", "type": "others"}))
+    return documents
+
+
+def sample_queries(plans_path: str) -> List[str]:
+    """Build one query per plan and important question, and per plan and service."""
+    with open(plans_path, 'r', encoding='utf-8') as f:
+        plans_data = json.load(f)
+    queries = []
+    for plan in plans_data:
+        plan_name = plan["plan details"]["plan name"]
+        for question_data in plan["important questions"]:
+            queries.append(f"{question_data['question']} ({plan_name} plan)")
+        for event in plan["common medical events"]:
+            for service in event["services"]:
+                queries.append(f"How much do I pay for {service['service name'].lower()} on the {plan_name} plan?")
+    return queries
+
+
+def _words(text: str) -> set:
+    return set(re.findall(r'\w+', text.lower()))
+
+
+def retrieve(query: str, documents: List[Document], k: int) -> List[Document]:
+    """Rank documents by the number of words they share with the query."""
+    query_words = _words(query)
+    return sorted(documents, key=lambda doc: len(query_words & _words(doc.page_content)), reverse=True)[:k]
+
+
+def report(documents: List[Document], queries: List[str], plan_details: Dict, k: int) -> Dict[str, float]:
+    embedding_encoding = tiktoken.get_encoding("cl100k_base")
+    prompt_encoding = tiktoken.get_encoding("o200k_base")
+    prompt_tokens = [
+        len(prompt_encoding.encode(generate_user_prompt(query, retrieve(query, documents, k), plan_details)))
+        for query in queries
+    ]
+    return {
+        "chunks": len(documents),
+        "text_bytes": sum(len(doc.page_content.encode('utf-8')) for doc in documents),
+        "embedding_tokens": sum(len(embedding_encoding.encode(doc.page_content)) for doc in documents),
+        "avg_prompt_tokens": round(sum(prompt_tokens) / len(prompt_tokens), 1),
+    }
+
+
+if __name__ == "__main__":
+    vector_store = VectorStore()
+    queries = sample_queries(vector_store.plans_path)
+    with open(vector_store.plans_path, 'r', encoding='utf-8') as f:
+        plan_details = {plan["plan details"]["plan name"]: plan["plan details"] for plan in json.load(f)}
+
+    before = report(legacy_plan_documents(vector_store.plans_path), queries, {}, k=10)
+    after = report(vector_store._load_plans(), queries, plan_details, k=10)
+    print(f"{'':20s}{'before':>12s}{'after':>12s}")
+    for key in before:
+        print(f"{key:20s}{before[key]:>12}{after[key]:>12}")
@@ -0,0 +1,179 @@
+"""
+Load-test the backend end to end against the local OpenAI stand-in.
+
+By default this starts benchmarks.fake_openai and main.app in-process on local ports, waits for
+/ready, then sends /get_answer (or /get_answer/stream) traffic at each concurrency level. It
+reports throughput, p50/p95/p99 latency and error rate per level. No request leaves the machine,
+so results do not depend on OpenAI's latency and the run costs nothing.
+
+The vector stores under data/ must exist. Queries are FAQ questions and the plans' important
+questions. With `--query-mode unique` (the default) each request gets a distinct suffix, so the
+caches and request coalescing never short-circuit it. `--query-mode pool` repeats the questions
+as they are, which exercises those fast paths.
+
+Usage:
+    python -m benchmarks.load_test --levels 1,8,32 --requests 200 --llm-latency-ms 300
+    python -m benchmarks.load_test --target http://127.0.0.1:8000   # an already running backend
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+import uvicorn
+
+
+def _load_questions() -> List[str]:
+    questions = []
+    with open("data/angelone_faq_pairs.json", 'r', encoding='utf-8') as f:
+        for entry in json.load(f):
+            questions.extend(faq["question"] for faq in entry["faq_pairs"])
+    with open("data/plans_final.json", 'r', encoding='utf-8') as f:
+        for plan in json.load(f):
+            questions.extend(f"{question['question']} ({plan['plan details']['plan name']})" for question in plan["important questions"])
+    return questions
+
+
+def _serve(app: Any, port: int) -> uvicorn.Server:
+    """Run an ASGI app on a local port in a background thread."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def _start_local_servers(args: argparse.Namespace) -> str:
+    """Start the OpenAI stand-in and the backend pointed at it; return the backend's URL."""
+    from benchmarks.fake_openai import create_app
+
+    _serve(create_app(args.llm_latency_ms / 1000, args.embedding_latency_ms / 1000, args.stream_chunks), args.fake_openai_port)
+    # The OpenAI clients are created when the RAG engines load, after these are set.
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.fake_openai_port}/v1"
+    os.environ["OPENAI_API_KEY"] = "fake"
+    from main import app
+
+    _serve(app, args.port)
+    return f"http://127.0.0.1:{args.port}"
+
+
+async def _wait_ready(client: httpx.AsyncClient, timeout: float = 300.0) -> None:
+    """Wait for /ready to return 200, failing as soon as it reports a warm-up error."""
+    deadline = time.monotonic() + timeout
+    status = None
+    while time.monotonic() < deadline:
+        try:
+            response = await client.get("/ready")
+        except httpx.TransportError:
+            pass
+        else:
+            if response.status_code == 200:
+                return
+            status = response.json()
+            if status.get("warm_up_error"):
+                raise RuntimeError(f"Backend warm-up failed: {status['warm_up_error']}")
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"Backend did not become ready: {status}")
+
+
+async def _request(client: httpx.AsyncClient, query: str, stream: bool) -> bool:
+    """Send one query and return whether it succeeded."""
+    if not stream:
+        response = await client.get("/get_answer", params={"query": query})
+        return response.status_code == 200
+    async with client.stream("GET", "/get_answer/stream", params={"query": query}) as response:
+        if response.status_code != 200:
+            return False
+        async for line in response.aiter_lines():
+            if line == "event: failed":
+                return False
+            if line == "event: sources":
+                return True
+    return False
+
+
+async def _run_level(client: httpx.AsyncClient, queries: itertools.cycle, concurrency: int, requests: int, stream: bool) -> Dict[str, float]:
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            query = next(queries)
+            start = time.perf_counter()
+            try:
+                ok = await _request(client, query, stream)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "error_rate": errors / len(latencies),
+    }
+
+
+async def run(args: argparse.Namespace, base_url: str) -> List[Dict[str, float]]:
+    questions = _load_questions()
+    if args.query_mode == "unique":
+        queries = (f"{question} [{i}]" for i, question in enumerate(itertools.cycle(questions)))
+    else:
+        queries = itertools.cycle(questions)
+
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+        await _wait_ready(client)
+        for concurrency in args.levels:
+            results.append(await _run_level(client, queries, concurrency, args.requests, args.endpoint == "stream"))
+    return results
+
+
+def report(results: List[Dict[str, float]]) -> None:
+    print(f"{'concurrency':>11} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for row in results:
+        print(
+            f"{row['concurrency']:>11} {row['requests']:>8} {row['throughput_rps']:>8.1f} {row['p50_ms']:>8.1f} "
+            f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['error_rate']:>7.1%}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test /get_answer against a local OpenAI stand-in.")
+    parser.add_argument("--levels", type=lambda value: [int(level) for level in value.split(",")], default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--endpoint", choices=["answer", "stream"], default="answer")
+    parser.add_argument("--query-mode", choices=["unique", "pool"], default="unique")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--target", help="URL of a running backend; by default one is started locally")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fake-openai-port", type=int, default=9100)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--embedding-latency-ms", type=float, default=30.0)
+    parser.add_argument("--stream-chunks", type=int, default=20)
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    base_url: Optional[str] = args.target or _start_local_servers(args)
+    results = asyncio.run(run(args, base_url))
+    report(results)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,187 @@
+"""
+Sweep retrieval settings and report quality against latency for each corpus.
+
+Query sets are built from the source data, with known relevant documents:
+- AngelOne: every FAQ question. The pages it appears on are relevant, and a retrieved document
+  counts as relevant when its source URL is one of them.
+- Insurance: every plan's important questions, plus one question per medical-event service
+  ("How much does <service> cost with the <plan> plan?"). The chunk the query was made from
+  is the relevant document.
+
+Each configuration runs `RAG.retrieve_documents` for every query and reports recall@k (the
+fraction of relevant documents retrieved), MRR (the reciprocal rank of the first relevant
+document) and retrieval latency. Query embeddings are computed once, up front, and kept in a
+sqlite cache across runs, so the timings cover search only. Only the first run calls OpenAI.
+
+Usage:
+    python -m rag.flat_index                      # export the flat indexes for the flat backends
+    python -m benchmarks.retrieval_sweep --k 3,5,10,20 --backends chroma,flat,flat-int8 --min-recall 0.9
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.embedding_cache import QueryEmbeddingCache
+from rag.rag import CORPORA, RAG
+from rag.vector_store import VectorStore
+
+# Queries with the source URLs (AngelOne) or chunk texts (insurance) of their relevant documents.
+QuerySet = List[Tuple[str, Set[str]]]
+
+
+def angelone_queries(path: str = "data/angelone_faq_pairs.json") -> QuerySet:
+    """FAQ questions, each with the URLs of the pages it appears on."""
+    with open(path, 'r', encoding='utf-8') as f:
+        faq_data = json.load(f)
+    urls: Dict[str, Set[str]] = {}
+    for entry in faq_data:
+        for faq in entry['faq_pairs']:
+            urls.setdefault(faq['question'], set()).add(entry['url'])
+    return list(urls.items())
+
+
+def insurance_queries(path: str = "data/plans_final.json") -> QuerySet:
+    """Plan important questions and service cost questions, each with the text of its chunk."""
+    with open(path, 'r', encoding='utf-8') as f:
+        plans_data = json.load(f)
+    # Chunks are matched by text rather than id, so stores built before every build path used
+    # stable ids are still scored correctly.
+    vector_store = VectorStore()
+    vector_store.plans_path = path
+    chunks = {document.id: document.page_content for document in vector_store._load_plans()}
+    queries = []
+    for plan in plans_data:
+        plan_name = plan["plan details"]["plan name"]
+        for question in plan["important questions"]:
+            chunk_id = VectorStore._stable_id("plans", plan_name, "important_questions", question["question"])
+            queries.append((f"{question['question']} ({plan_name} plan)", {chunks[chunk_id]}))
+        for event in plan["common medical events"]:
+            for service in event["services"]:
+                chunk_id = VectorStore._stable_id("plans", plan_name, "medical_events", event["event category"], service["service name"])
+                queries.append((f"How much does {service['service name'].lower()} cost with the {plan_name} plan?", {chunks[chunk_id]}))
+    return queries
+
+
+def _keys(document: Document, corpus: str) -> List[str]:
+    """Return what a retrieved document is matched against the relevant set by."""
+    if corpus != "angelone":
+        return [document.page_content]
+    # A deduplicated FAQ document stands for every page it appears on.
+    return (document.metadata.get("sources") or document.metadata.get("source") or "").split("\n")
+
+
+def evaluate(rag: RAG, corpus: str, queries: QuerySet) -> Dict[str, Any]:
+    """Run every query through retrieval and score the results."""
+    recalls, reciprocal_ranks, latencies = [], [], []
+    for query, relevant in queries:
+        start = time.perf_counter()
+        documents = rag.retrieve_documents(query)
+        latencies.append(1000 * (time.perf_counter() - start))
+
+        found: Set[str] = set()
+        first_rank = None
+        for rank, document in enumerate(documents, start=1):
+            matched = relevant.intersection(_keys(document, corpus))
+            if matched:
+                found.update(matched)
+                first_rank = first_rank or rank
+        recalls.append(len(found) / len(relevant))
+        reciprocal_ranks.append(1 / first_rank if first_rank else 0.0)
+
+    return {
+        "recall": round(float(np.mean(recalls)), 4),
+        "mrr": round(float(np.mean(reciprocal_ranks)), 4),
+        "mean_ms": round(float(np.mean(latencies)), 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def sweep(
+    corpus: str,
+    queries: QuerySet,
+    k_values: List[int],
+    backends: List[str],
+    oversamples: List[int],
+    embedding_cache: QueryEmbeddingCache,
+) -> List[Dict[str, Any]]:
+    """Evaluate every combination of backend, search parameters and k for one corpus."""
+    config = CORPORA[corpus]
+    # With query hints, insurance retrieval is evaluated with and without metadata filters.
+    hint_settings = [False, True] if config.get("query_hints") else [False]
+    results = []
+    for backend in backends:
+        for hints in hint_settings:
+            rag = RAG(
+                config["vector_store_directory"],
+                name=corpus,
+                backend=backend,
+                query_hints=hints,
+                min_filtered_hits=config.get("min_filtered_hits", 3),
+                embedding_cache=embedding_cache,
+            )
+            for query, _ in queries:
+                rag.embed_query(query)
+            for oversample in (oversamples if backend == "flat-int8" else [None]):
+                if oversample is not None:
+                    rag.retriever.oversample = oversample
+                for k in k_values:
+                    rag.retriever_k = k
+                    row = {"corpus": corpus, "backend": backend, "query_hints": hints, "oversample": oversample, "k": k}
+                    row.update(evaluate(rag, corpus, queries))
+                    results.append(row)
+                    print(
+                        f"  {backend:9s} hints={str(hints):5s} oversample={str(oversample):4s} k={k:<3d} "
+                        f"recall@k={row['recall']:.4f} mrr={row['mrr']:.4f} p50={row['p50_ms']:.2f}ms p95={row['p95_ms']:.2f}ms"
+                    )
+    return results
+
+
+def fastest(results: List[Dict[str, Any]], min_recall: float) -> Optional[Dict[str, Any]]:
+    """Return the setting with the lowest p95 latency whose recall meets the bar."""
+    passing = [row for row in results if row["recall"] >= min_recall]
+    return min(passing, key=lambda row: (row["p95_ms"], row["k"])) if passing else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpora", default="angelone,insurance")
+    parser.add_argument("--k", default="3,5,10,20", help="Comma-separated retriever_k values")
+    parser.add_argument("--backends", default="chroma,flat,flat-int8", help="Comma-separated retrieval backends")
+    parser.add_argument("--oversample", default="2,4,8", help="Comma-separated int8 shortlist multiples for flat-int8")
+    parser.add_argument("--max-queries", type=int, default=0, help="Use at most this many queries per corpus (0 for all)")
+    parser.add_argument("--min-recall", type=float, default=0.9, help="Quality bar for picking the fastest setting")
+    parser.add_argument("--embedding-cache", default="data/cache/sweep_query_embeddings.sqlite3")
+    parser.add_argument("--json", dest="json_path", help="Also write every result row to this file")
+    args = parser.parse_args()
+
+    embedding_cache = QueryEmbeddingCache(max_size=100_000, path=args.embedding_cache)
+    query_sets = {"angelone": angelone_queries, "insurance": insurance_queries}
+    all_results = []
+    for corpus in args.corpora.split(","):
+        queries = query_sets[corpus]()
+        if args.max_queries:
+            queries = queries[:args.max_queries]
+        print(f"{corpus}: {len(queries)} queries")
+        results = sweep(
+            corpus,
+            queries,
+            [int(k) for k in args.k.split(",")],
+            args.backends.split(","),
+            [int(oversample) for oversample in args.oversample.split(",")],
+            embedding_cache,
+        )
+        best = fastest(results, args.min_recall)
+        if best is None:
+            print(f"  No setting reaches recall@k >= {args.min_recall}")
+        else:
+            print(f"  Fastest setting with recall@k >= {args.min_recall}: {best}")
+        all_results.extend(results)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(all_results, f, indent=2)
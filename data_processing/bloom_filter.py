@@ -0,0 +1,52 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    A fixed-size probabilistic set of strings.
+
+    Membership tests never miss an added item, and report an item that was never added with
+    probability at most `error_rate` while no more than `capacity` items are added. Memory is
+    about 1.2 MB per 500,000 items at an error rate of 1e-4, against tens of MB for a Python
+    set of URLs.
+    """
+
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        """
+        Initialize the filter.
+
+        Args:
+            capacity (int): Number of items the error rate holds for
+            error_rate (float): False positive rate at `capacity` items
+        """
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from the two halves of one 128-bit digest.
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def add(self, item: str) -> bool:
+        """
+        Add an item; return True if it was not in the filter before.
+        """
+        added = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        self.count += added
+        return added
+
+    def __len__(self) -> int:
+        return self.count
@@ -0,0 +1,173 @@
+import argparse
+import json
+import re
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+import numpy as np
+
+INPUT_FILE = 'data/angelone_faq_pairs.json'
+# A prime above 2**32, the range of the shingle hashes.
+_PRIME = 4294967311
+
+def normalize_text(text: str) -> str:
+    """
+    Lowercase text and reduce punctuation and whitespace runs to single spaces
+    """
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', text.lower())).strip()
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """
+    Return the sorted, distinct 32-bit hashes of the character shingles of normalized text
+    """
+    codes = np.frombuffer(normalize_text(text).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    count = max(1, len(codes) - size + 1)
+    hashes = np.zeros(count, dtype=np.uint64)
+    # A polynomial rolling hash over every window at once; uint64 arithmetic wraps around.
+    for offset in range(min(size, len(codes))):
+        hashes = hashes * np.uint64(1000003) + codes[offset:offset + count]
+    return np.unique(hashes & np.uint64(0xFFFFFFFF))
+
+def jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    intersection = len(np.intersect1d(a, b, assume_unique=True))
+    return intersection / (len(a) + len(b) - intersection)
+
+def minhash_signatures(shingle_sets: List[np.ndarray], num_perm: int = 128, seed: int = 0) -> np.ndarray:
+    """
+    Return a (documents, num_perm) MinHash signature matrix.
+
+    Each permutation is a universal hash (a * x + b) mod p; the fraction of equal columns of
+    two rows estimates the Jaccard similarity of their shingle sets.
+    """
+    rng = np.random.default_rng(seed)
+    # a and b stay below 2**31 so a * x + b fits in 64 bits for 32-bit shingle hashes.
+    a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(shingle_sets), num_perm), dtype=np.uint64)
+    for row, hashes in enumerate(shingle_sets):
+        signatures[row] = ((np.outer(hashes, a) + b) % _PRIME).min(axis=0)
+    return signatures
+
+def lsh_buckets(signatures: np.ndarray, bands: int) -> Iterator[np.ndarray]:
+    """
+    Yield, for every band, each group of two or more rows that agree on all of its values.
+
+    With r = num_perm / bands rows per band, two rows with Jaccard similarity s share a
+    bucket with probability 1 - (1 - s**r) ** bands, so only likely duplicates are compared
+    exactly.
+    """
+    rows = signatures.shape[1] // bands
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows]).view(f'V{8 * rows}').ravel()
+        _, bucket_of, sizes = np.unique(keys, return_inverse=True, return_counts=True)
+        order = np.argsort(bucket_of, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        for start, size in zip(starts, sizes):
+            if size > 1:
+                yield order[start:start + size]
+
+def dedup_faq_pairs(
+    faq_data: List[Dict[str, Any]],
+    threshold: float = 0.85,
+    num_perm: int = 128,
+    bands: int = 32,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Collapse repeated Q&A pairs across pages into one entry carrying every source URL.
+
+    Pairs whose normalized question and answer are equal are exact duplicates. Pairs whose
+    question and answer shingle sets each have Jaccard similarity of at least `threshold`
+    are near duplicates. Both must match: different questions often share a templated answer
+    ("activate the currency segment" / "the commodity segment"), and merging those would lose
+    the distinction. Near-duplicate candidates come from MinHash LSH over the whole pair, so
+    the work grows with the number of pairs rather than with the number of pairs of pairs.
+
+    Args:
+        faq_data (List[Dict[str, Any]]): Entries of angelone_faq_pairs.json, with 'url' and 'faq_pairs'
+        threshold (float): Jaccard similarity for near duplicates; above 1 only exact duplicates collapse
+        num_perm (int): MinHash permutations
+        bands (int): LSH bands; num_perm must be a multiple of it
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Dict[str, Any]]: The deduplicated entries, each with
+        'question', 'answer' and 'urls' in first-seen order, and a report of the shrinkage
+    """
+    pairs = [(entry['url'], faq['question'], faq['answer']) for entry in faq_data for faq in entry['faq_pairs']]
+
+    # Exact duplicates by normalized text.
+    exact_groups: Dict[Tuple[str, str], List[int]] = {}
+    for index, (_, question, answer) in enumerate(pairs):
+        exact_groups.setdefault((normalize_text(question), normalize_text(answer)), []).append(index)
+    representatives = [members[0] for members in exact_groups.values()]
+
+    # Near duplicates among the distinct pairs, merged with union-find.
+    parent = list(range(len(representatives)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    if threshold <= 1 and len(representatives) > 1:
+        question_shingles = [shingles(pairs[index][1]) for index in representatives]
+        answer_shingles = [shingles(pairs[index][2]) for index in representatives]
+        signatures = minhash_signatures([np.union1d(q, a) for q, a in zip(question_shingles, answer_shingles)], num_perm)
+        compared: Set[Tuple[int, int]] = set()
+        for bucket in lsh_buckets(signatures, bands):
+            # Each group in the bucket is compared through its root only, so a bucket whose
+            # members were already merged costs nothing, however large it is.
+            roots = list(dict.fromkeys(find(i) for i in bucket.tolist()))
+            for position, i in enumerate(roots):
+                for j in roots[position + 1:]:
+                    # The same two rows usually share several bands; compare them once.
+                    if find(i) == find(j) or (i, j) in compared:
+                        continue
+                    compared.add((i, j))
+                    if jaccard(question_shingles[i], question_shingles[j]) >= threshold and jaccard(answer_shingles[i], answer_shingles[j]) >= threshold:
+                        parent[find(i)] = find(j)
+
+    groups: Dict[int, List[int]] = {}
+    for position, members in enumerate(exact_groups.values()):
+        groups.setdefault(find(position), []).extend(members)
+
+    deduped = []
+    for members in sorted(groups.values(), key=min):
+        members.sort()
+        # The longest answer of the group is kept; ties go to the first occurrence.
+        keep = max(members, key=lambda index: (len(pairs[index][2]), -index))
+        urls = list(dict.fromkeys(pairs[index][0] for index in members))
+        deduped.append({'question': pairs[keep][1], 'answer': pairs[keep][2], 'urls': urls})
+
+    characters = sum(len(question) + len(answer) for _, question, answer in pairs)
+    kept_characters = sum(len(entry['question']) + len(entry['answer']) for entry in deduped)
+    report = {
+        'pairs': len(pairs),
+        'documents': len(deduped),
+        'exact_duplicates': len(pairs) - len(exact_groups),
+        'near_duplicates': len(exact_groups) - len(deduped),
+        'multi_source_documents': sum(len(entry['urls']) > 1 for entry in deduped),
+        'documents_removed_pct': round(100 * (1 - len(deduped) / len(pairs)), 2) if pairs else 0.0,
+        'characters_removed_pct': round(100 * (1 - kept_characters / characters), 2) if characters else 0.0,
+    }
+    return deduped, report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report exact and near-duplicate AngelOne FAQ pairs.")
+    parser.add_argument("--input", default=INPUT_FILE)
+    parser.add_argument("--threshold", type=float, default=0.85, help="Question and answer Jaccard similarity for near duplicates")
+    parser.add_argument("--output", help="Also write the deduplicated pairs to this file")
+    parser.add_argument("--show", type=int, default=10, help="Print this many merged groups")
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        faq_data = json.load(f)
+    deduped, report = dedup_faq_pairs(faq_data, args.threshold)
+
+    for entry in [entry for entry in deduped if len(entry['urls']) > 1][:args.show]:
+        print(f"{entry['question']}")
+        for url in entry['urls']:
+            print(f"    {url}")
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(deduped, f, indent=2, ensure_ascii=False)
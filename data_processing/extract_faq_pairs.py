@@ -1,10 +1,19 @@
+import argparse
 import json
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from lxml import etree, html
 from scrapy import Selector
-from typing import List, Dict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 import os
 
-INPUT_FILE = 'data/angelone_support_content.json'
+from data_processing.spiders.fetch_content import commit_crawl_state
+
+INPUT_FILE = 'data/angelone_support_content.jsonl'
+# Content scraped before the fetcher wrote JSON lines is a single JSON array.
+LEGACY_INPUT_FILE = 'data/angelone_support_content.json'
 OUTPUT_FILE = 'data/angelone_faq_pairs.json'
 
 def clean_text(text: str) -> str:
@@ -68,34 +77,324 @@ def extract_faq_pairs_from_html(html_content: str) -> List[Dict[str, str]]:
     
     return faq_pairs
 
-def process_content_file():
+_CLASS_SEPARATOR = re.compile(r'[ \t\r\n]+')
+
+def _has_class(element, name: str) -> bool:
+    # Matches CSS class selectors as parsel translates them (normalize-space on @class).
+    return name in _CLASS_SEPARATOR.split(element.get('class', '').strip())
+
+def _first_text(element) -> Optional[str]:
+    """
+    Return the first descendant text node of an element in document order, like `::text` + get()
+    """
+    if element.text:
+        return element.text
+    for child in element:
+        if isinstance(child.tag, str):
+            text = _first_text(child)
+            if text:
+                return text
+        if child.tail:
+            return child.tail
+    return None
+
+def _parse_html(html_content: str):
     """
-    Process the scraped content file and extract all Q&A pairs
+    Parse HTML the same way scrapy's Selector does
+    """
+    body = html_content.strip().replace('\x00', '').encode('utf-8') or b'<html/>'
+    parser = html.HTMLParser(recover=True, encoding='utf-8', huge_tree=True)
+    root = etree.fromstring(body, parser=parser)
+    if root is None:
+        root = etree.fromstring(b'<html/>', parser=parser)
+    return root
+
+def _scan_tab(tab) -> Tuple[Optional[str], List[Any]]:
+    """
+    Walk a tab once, returning its raw question text and its answer content divs.
+
+    The question is the first text node directly inside a span within a label.tab-label.
+    Content divs are div.content elements inside a div.tab-content, in document order.
+    """
+    question = None
+    content_divs = []
+    label_depth = 0
+    tab_content_depth = 0
+    # For each open element: whether it is a question span, a label.tab-label, a div.tab-content.
+    stack = []
+    for event, element in etree.iterwalk(tab, events=('start', 'end', 'comment', 'pi')):
+        if event == 'start':
+            is_span = element.tag == 'span' and label_depth > 0
+            is_label = element.tag == 'label' and _has_class(element, 'tab-label')
+            is_tab_content = element.tag == 'div' and _has_class(element, 'tab-content')
+            if element.tag == 'div' and tab_content_depth > 0 and _has_class(element, 'content'):
+                content_divs.append(element)
+            if question is None and is_span and element.text:
+                question = element.text
+            stack.append((is_span, is_label, is_tab_content))
+            label_depth += is_label
+            tab_content_depth += is_tab_content
+            continue
+
+        if event == 'end':
+            _, is_label, is_tab_content = stack.pop()
+            label_depth -= is_label
+            tab_content_depth -= is_tab_content
+        # The tail of an element or comment is a text node of its parent.
+        if question is None and element.tail and stack and stack[-1][0]:
+            question = element.tail
+    return question, content_divs
+
+def extract_faq_pairs_lxml(html_content: str) -> List[Dict[str, str]]:
+    """
+    Extract question-answer pairs from HTML content with one walk over each tab.
+
+    Produces the same output as extract_faq_pairs_from_html without re-evaluating CSS
+    selectors for every element.
     """
-    # Load the scraped content
-    with open(INPUT_FILE, 'r', encoding='utf-8') as f:
-        content_data = json.load(f)
+    if not html_content:
+        return []
     
-    all_faq_pairs = []
+    root = _parse_html(html_content)
+    faq_pairs = []
     
-    for item in content_data:
-        url = item['url']
-        html_content = item.get('content', '')
+    for tab in root.iter('div'):
+        if not _has_class(tab, 'tab'):
+            continue
+        question, content_divs = _scan_tab(tab)
+        if not question:
+            continue
+        question = clean_text(question)
+        
+        answer_parts = []
+        for content_div in content_divs:
+            for element in content_div.iter('p', 'li'):
+                text = clean_text(_first_text(element) or '')
+                if text:
+                    answer_parts.append(text if element.tag == 'p' else f"• {text}")
         
-        if html_content:
-            faq_pairs = extract_faq_pairs_from_html(html_content)
-            all_faq_pairs.append({'url': url, 'faq_pairs': faq_pairs})
-            print(f"Extracted {len(faq_pairs)} Q&A pairs from {url}")
+        answer = '\n'.join(answer_parts)
+        if answer:
+            faq_pairs.append({
+                'question': question,
+                'answer': answer,
+            })
+    
+    return faq_pairs
+
+# Pages sent to a worker per task, and the fewest pages worth starting a process pool for.
+EXTRACT_CHUNK_SIZE = 32
+MIN_POOL_PAGES = 256
+
+def _extract_chunk(contents: List[str]) -> List[List[Dict[str, str]]]:
+    return [extract_faq_pairs_lxml(content) for content in contents]
+
+def _chunks(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def extract_pages(
+    records: Iterable[Dict[str, Any]],
+    workers: int = 1,
+    chunksize: int = EXTRACT_CHUNK_SIZE,
+) -> Iterator[Tuple[Dict[str, Any], List[Dict[str, str]]]]:
+    """
+    Yield each record with its Q&A pairs, in input order.
+
+    With more than one worker and at least MIN_POOL_PAGES pages, pages are extracted in a
+    process pool, `chunksize` pages per task. Only a couple of chunks per worker are in
+    flight, so records are still read as they are needed. Smaller inputs are extracted
+    in-process, where starting the pool and pickling each page would cost more than it saves.
+    """
+    records = iter(records)
+    head = list(islice(records, MIN_POOL_PAGES)) if workers > 1 else []
+    if len(head) < MIN_POOL_PAGES:
+        for record in chain(head, records):
+            yield record, extract_faq_pairs_lxml(record.get('content') or '')
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in _chunks(chain(head, records), chunksize):
+            pending.append((chunk, executor.submit(_extract_chunk, [record.get('content') or '' for record in chunk])))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield from zip(chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from zip(chunk, future.result())
+
+def _iter_json_array_spans(f, chunk_size: int = 1 << 16) -> Iterator[Tuple[int, int, Dict[str, Any]]]:
+    """
+    Yield the elements of a JSON array file one at a time with the byte offsets of their start
+    and end, reading it in chunks.
+
+    Offsets match the file on disk when it is opened with newline=''.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    # Byte offset of buffer[0]; the whitespace and punctuation between elements is ASCII.
+    position = 0
+    started = False
+    eof = False
+    while True:
+        stripped = buffer.lstrip()
+        position += len(buffer) - len(stripped)
+        buffer = stripped
+        if not started:
+            if buffer.startswith('['):
+                buffer = buffer[1:]
+                position += 1
+                started = True
+                continue
+        elif buffer.startswith(','):
+            buffer = buffer[1:]
+            position += 1
+            continue
+        elif buffer.startswith(']'):
+            return
+        elif buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # The element continues in the next chunk.
+                if eof:
+                    raise
+            else:
+                end_position = position + len(buffer[:end].encode('utf-8'))
+                yield position, end_position, item
+                buffer = buffer[end:]
+                position = end_position
+                continue
+
+        if eof:
+            if started:
+                raise ValueError("Unterminated JSON array")
+            return
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+
+def _iter_json_array(f, chunk_size: int = 1 << 16) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the elements of a JSON array file one at a time, reading it in chunks
+    """
+    for _, _, item in _iter_json_array_spans(f, chunk_size):
+        yield item
+
+class PreviousExtraction:
+    """
+    The Q&A pairs of an earlier output file, looked up by URL.
+
+    Only the URL and byte span of each entry are kept in memory; the pairs of a page are read
+    back from the file when they are reused.
+    """
+
+    def __init__(self, path: str):
+        self.spans: Dict[str, Tuple[int, int]] = {}
+        self.file = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                for start, end, entry in _iter_json_array_spans(f):
+                    self.spans[entry['url']] = (start, end)
+            self.file = open(path, 'rb')
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.spans
+
+    def __getitem__(self, url: str) -> List[Dict[str, str]]:
+        start, end = self.spans[url]
+        self.file.seek(start)
+        return json.loads(self.file.read(end - start))['faq_pairs']
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+
+def iter_content_records(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the scraped content records of a file one at a time.
+
+    JSON lines files (.jsonl) are read line by line; legacy files holding one JSON array
+    are decoded element by element, so memory stays bounded by the largest page.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
         else:
-            print(f"No content found for URL: {url}")
+            yield from _iter_json_array(f)
+
+def process_content_file(input_file: Optional[str] = None, output_file: str = OUTPUT_FILE, workers: int = 1):
+    """
+    Process the scraped content file and extract all Q&A pairs.
+
+    Pages are read and their Q&A pairs written one at a time, extracted across `workers`
+    processes. The output is still a single JSON array, written incrementally.
+
+    Records an incremental crawl marked `unchanged` carry no content; their Q&A pairs are
+    copied from the existing output file instead of being extracted again. So are those of
+    pages that failed to fetch, so a transient error does not drop a page from the index.
+
+    The output replaces the previous one only once it is complete, and then the crawl state
+    that produced the input is committed (see `commit_crawl_state`).
+    """
+    if input_file is None:
+        input_file = INPUT_FILE if os.path.exists(INPUT_FILE) else LEGACY_INPUT_FILE
+
+    previous_pairs = PreviousExtraction(output_file)
     
-    # Save the extracted Q&A pairs
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(all_faq_pairs, f, indent=2, ensure_ascii=False)
+    pages = 0
+    total_pairs = 0
+    reused = 0
+    try:
+        with open(output_file + '.tmp', 'w', encoding='utf-8') as out:
+            out.write('[')
+            for item, faq_pairs in extract_pages(iter_content_records(input_file), workers):
+                url = item['url']
+                html_content = item.get('content', '')
+
+                reuse = item.get('unchanged') or ('error' in item and url in previous_pairs)
+                if reuse:
+                    if url not in previous_pairs:
+                        print(f"Unchanged page has no previous extraction, skipping: {url}")
+                        continue
+                    faq_pairs = previous_pairs[url]
+                    reused += 1
+                
+                if html_content or reuse:
+                    entry = json.dumps({'url': url, 'faq_pairs': faq_pairs}, indent=2, ensure_ascii=False)
+                    out.write(('\n' if pages == 0 else ',\n') + '\n'.join('  ' + line for line in entry.split('\n')))
+                    pages += 1
+                    total_pairs += len(faq_pairs)
+                    print(f"Extracted {len(faq_pairs)} Q&A pairs from {url}")
+                else:
+                    print(f"No content found for URL: {url}")
+            out.write('\n]' if pages else ']')
+    finally:
+        previous_pairs.close()
+    os.replace(output_file + '.tmp', output_file)
+    committed = commit_crawl_state(input_file)
     
     print(f"\nExtraction complete!")
-    print(f"Total FAQ pairs extracted: {len(all_faq_pairs)}")
-    print(f"Saved to: {OUTPUT_FILE}")
+    print(f"Total pages with FAQ pairs: {pages}")
+    print(f"Total FAQ pairs extracted: {total_pairs}")
+    print(f"Pages reused from the previous extraction: {reused}")
+    print(f"Saved to: {output_file}")
+    if committed:
+        print(f"Committed the crawl state of {input_file}")
 
 if __name__ == "__main__":
-    process_content_file() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Extract FAQ pairs from the scraped AngelOne support pages.")
+    parser.add_argument("--input", default=None, help="Scraped content file (.jsonl or legacy .json)")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--workers", type=int, default=1, help=f"Processes to extract with; inputs under {MIN_POOL_PAGES} pages always use one")
+    args = parser.parse_args()
+    process_content_file(args.input, args.output, args.workers) 
\ No newline at end of file
@@ -1,5 +1,5 @@
 import scrapy
-# from spiders.url_finder import UrlFinder
+# from .spiders.url_finder import UrlFinder
 from .spiders.fetch_content import ContentFetcher
 
 # Utility class to run the spider programmatically
@@ -11,12 +11,14 @@ class AngelOneSupportScraper:
     def __init__(self, spider_class: scrapy.Spider):
         self.spider_class = spider_class
         
-    def run_spider(self, output_file: str = 'data/debug/angelone_support_pages.json'):
+    def run_spider(self, output_file: str = 'data/debug/angelone_support_pages.json', settings_overrides: dict = None, spider_kwargs: dict = None):
         """
         Run the spider and save results to a file.
         
         Args:
             output_file: Name of the output file to save scraped data
+            settings_overrides: Scrapy settings applied on top of the defaults below
+            spider_kwargs: Arguments passed to the spider, like `scrapy crawl -a`
         """
         from scrapy.crawler import CrawlerProcess
         from scrapy.utils.project import get_project_settings
@@ -37,15 +39,39 @@ class AngelOneSupportScraper:
             'CONCURRENT_REQUESTS_PER_DOMAIN': 8,
             'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36',
         })
+        settings.update(settings_overrides or {})
         
         # Create and start the crawler
         process = CrawlerProcess(settings)
-        process.crawl(self.spider_class)
+        process.crawl(self.spider_class, **(spider_kwargs or {}))
         process.start()
 
 
 # Example usage
 if __name__ == '__main__':
+    import argparse
+    from .spiders.fetch_content import INPUT_FILE, OUTPUT_FILE, STATE_FILE
+
+    parser = argparse.ArgumentParser(description="Fetch the content of the AngelOne support pages.")
+    parser.add_argument("--incremental", action="store_true", help="Send conditional requests and skip unchanged pages")
+    parser.add_argument("--input", default=INPUT_FILE, help="File with one URL per line")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    parser.add_argument("--state", default=STATE_FILE, help="Per-URL validators and content hashes")
+    parser.add_argument("--allowed-domains", default="angelone.in", help="Comma-separated domains the spider may fetch")
+    parser.add_argument("--download-delay", type=float, default=1.0)
+    parser.add_argument("--feed", default='data/debug/angelone_contentfetcher.json', help="Scrapy feed export of the scraped items")
+    args = parser.parse_args()
+
     # scraper = AngelOneSupportScraper(UrlFetcher)
     scraper = AngelOneSupportScraper(ContentFetcher)
-    scraper.run_spider('data/debug/angelone_contentfetcher.json')
+    scraper.run_spider(
+        args.feed,
+        settings_overrides={'DOWNLOAD_DELAY': args.download_delay},
+        spider_kwargs={
+            'incremental': args.incremental,
+            'input_file': args.input,
+            'output_file': args.output,
+            'state_file': args.state,
+            'allowed_domains': args.allowed_domains,
+        },
+    )
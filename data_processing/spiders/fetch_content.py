@@ -1,46 +1,142 @@
 import scrapy
+import hashlib
 import json
 import os
+from datetime import datetime, timezone
 from typing import Generator, Dict, Any
 
-OUTPUT_FILE = 'data/angelone_support_content.json'
+OUTPUT_FILE = 'data/angelone_support_content.jsonl'
 INPUT_FILE = 'data/angelone_support_urls_final.txt'
+# Validators and content hash of every fetched URL, used by incremental crawls.
+STATE_FILE = 'data/angelone_support_crawl_state.json'
+# Suffix of the state a crawl leaves next to its content file until that content is extracted.
+PENDING_STATE_SUFFIX = '.pending_state.json'
+
+def commit_crawl_state(content_file: str) -> bool:
+    """
+    Make the state of the crawl that wrote `content_file` the one the next crawl compares with.
+
+    Called once the content file has been extracted. Until then the previous state stays in
+    place, so a second crawl refetches the pages the first one found changed instead of
+    marking them unchanged against content that was never extracted.
+
+    Returns:
+        bool: Whether there was a pending state to commit
+    """
+    pending_file = content_file + PENDING_STATE_SUFFIX
+    if not os.path.exists(pending_file):
+        return False
+    with open(pending_file, 'r', encoding='utf-8') as f:
+        pending = json.load(f)
+    state_file = pending['state_file']
+    with open(state_file + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(pending['state'], f, indent=2)
+    os.replace(state_file + '.tmp', state_file)
+    os.remove(pending_file)
+    return True
 
 class ContentFetcher(scrapy.Spider):
+    """
+    Fetch the `.list-content` HTML of every support URL.
+
+    With `-a incremental=true`, requests carry If-None-Match / If-Modified-Since from the last
+    crawl's state. A page answered with 304, or whose content hash is unchanged, is written as
+    `{"url": ..., "unchanged": true}` without content, so extraction and embedding can reuse
+    what they produced for it last time.
+
+    The new state is written next to the content file and only replaces the state file once
+    extraction has consumed that content (see `commit_crawl_state`).
+    """
     name = 'angelone_content_fetcher'
     allowed_domains = ['angelone.in']
+    input_file = INPUT_FILE
+    output_file = OUTPUT_FILE
+    state_file = STATE_FILE
+    incremental = False
     
     def __init__(self, *args, **kwargs):
         super(ContentFetcher, self).__init__(*args, **kwargs)
-        self.scraped_content = []
+        # Spider arguments given with -a are strings.
+        if isinstance(self.incremental, str):
+            self.incremental = self.incremental.lower() in ('1', 'true', 'yes')
+        if isinstance(self.allowed_domains, str):
+            self.allowed_domains = self.allowed_domains.split(',')
+        # Items are appended to the output file as JSON lines as soon as they are scraped, so
+        # memory does not grow with the crawl and a crash keeps everything written so far.
+        os.makedirs(os.path.dirname(self.output_file) or '.', exist_ok=True)
+        self.output = open(self.output_file, 'w', encoding='utf-8')
+        self.state: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        self.changed_pages = 0
+        self.unchanged_pages = 0
+        self.failed_scrapes = 0
+
+    def write_item(self, item: Dict[str, Any]) -> None:
+        """
+        Append one item to the output file as a JSON line
+        """
+        self.output.write(json.dumps(item, ensure_ascii=False) + '\n')
+        self.output.flush()
         
     def start_requests(self):
         """
         Read URLs from the filtered file and create requests for each URL
         """
-        if not os.path.exists(INPUT_FILE):
-            self.logger.error(f"Input file {INPUT_FILE} not found!")
+        if not os.path.exists(self.input_file):
+            self.logger.error(f"Input file {self.input_file} not found!")
             return
             
-        with open(INPUT_FILE, 'r') as f:
+        with open(self.input_file, 'r') as f:
             urls = [line.strip() for line in f.readlines() if line.strip()]
         
         self.logger.info(f"Found {len(urls)} URLs to scrape")
         
         for url in urls:
+            headers = {}
+            previous = self.state.get(url, {}) if self.incremental else {}
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
             yield scrapy.Request(
                 url=url,
+                headers=headers,
                 callback=self.parse_content,
-                errback=self.handle_error
+                errback=self.handle_error,
+                # Conditional requests must not be answered from the HTTP cache, and 304 must
+                # reach the callback instead of being treated as an error.
+                meta={'handle_httpstatus_list': [304], 'source_url': url},
+                dont_filter=True,
             )
     
     def parse_content(self, response) -> Generator[Dict[str, Any], None, None]:
         """
         Extract raw HTML content from each page
         """
+        url = response.meta.get('source_url', response.url)
+        previous = self.state.get(url, {})
+        if response.status == 304:
+            self.logger.info(f'Not modified: {url}')
+            yield from self._unchanged(previous.get('final_url', url))
+            return
+
         self.logger.info(f'Scraping content from: {response.url}')
 
         content = response.css('.list-content').get()
+        content_hash = hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+        self.state[url] = {
+            'etag': response.headers.get('ETag', b'').decode('latin-1') or None,
+            'last_modified': response.headers.get('Last-Modified', b'').decode('latin-1') or None,
+            'content_hash': content_hash,
+            'final_url': response.url,
+            'fetched_at': datetime.now(timezone.utc).isoformat(),
+        }
+        if self.incremental and previous.get('content_hash') == content_hash:
+            # The server sent the page again, but the part we extract has not changed.
+            yield from self._unchanged(response.url)
+            return
 
         if content:
             self.logger.info(f'Content extracted from: {response.url}')
@@ -54,11 +150,21 @@ class ContentFetcher(scrapy.Spider):
             'scraped_at': response.meta.get('download_time', '').isoformat() if response.meta.get('download_time') else None
         }
         
-        self.scraped_content.append(content_item)
+        self.write_item(content_item)
+        self.changed_pages += 1
         
         yield content_item
+
+    def _unchanged(self, url: str) -> Generator[Dict[str, Any], None, None]:
+        """
+        Record a page whose content is the same as in the previous crawl
+        """
+        item = {'url': url, 'unchanged': True}
+        self.write_item(item)
+        self.unchanged_pages += 1
+        yield item
     
-    def handle_error(self, failure):
+    def handle_error(self, failure) -> Generator[Dict[str, Any], None, None]:
         """
         Handle request errors
         """
@@ -68,33 +174,33 @@ class ContentFetcher(scrapy.Spider):
         error_item = {
             'url': failure.request.url,
             'error': str(failure.value),
-            'status_code': getattr(failure.value, 'response', {}).get('status', None) if hasattr(failure.value, 'response') else None,
+            'status_code': failure.value.response.status if hasattr(failure.value, 'response') else None,
             'scraped_at': None
         }
         
-        self.scraped_content.append(error_item)
+        self.write_item(error_item)
+        self.failed_scrapes += 1
         yield error_item
     
     def closed(self, reason):
         """
-        Called when the spider closes. Save all content to JSON file.
+        Called when the spider closes. Close the output file and log a summary.
         """
         self.logger.info(f'Spider closed: {reason}')
-        self.logger.info(f'Total pages processed: {len(self.scraped_content)}')
+        self.logger.info(f'Total pages processed: {self.changed_pages + self.unchanged_pages + self.failed_scrapes}')
         
-        # Create output directory if it doesn't exist
-        os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-        
-        # Save all scraped content to JSON file
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            json.dump(self.scraped_content, f, indent=2, ensure_ascii=False)
-        
-        self.logger.info(f'All content saved to {OUTPUT_FILE}')
+        self.output.close()
+        self.logger.info(f'All content saved to {self.output_file}')
+
+        # Failed URLs keep their previous state, so the next crawl still sends their validators.
+        # The state is committed by extraction, once this content has been used.
+        pending_file = self.output_file + PENDING_STATE_SUFFIX
+        with open(pending_file + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'state_file': os.path.abspath(self.state_file), 'state': self.state}, f, indent=2)
+        os.replace(pending_file + '.tmp', pending_file)
         
         # Print summary statistics
-        successful_scrapes = sum(1 for item in self.scraped_content if 'error' not in item)
-        failed_scrapes = sum(1 for item in self.scraped_content if 'error' in item)
-        
         self.logger.info(f'Summary:')
-        self.logger.info(f'  Successful scrapes: {successful_scrapes}')
-        self.logger.info(f'  Failed scrapes: {failed_scrapes}')
+        self.logger.info(f'  Changed pages: {self.changed_pages}')
+        self.logger.info(f'  Unchanged pages: {self.unchanged_pages}')
+        self.logger.info(f'  Failed scrapes: {self.failed_scrapes}')
@@ -1,89 +1,202 @@
 import scrapy
+import os
+from scrapy.http import TextResponse
+from scrapy.utils.gz import gunzip
+from scrapy.utils.sitemap import Sitemap
 from urllib.parse import urljoin, urlparse
-from typing import Set, Generator
+from typing import Generator, Optional
 
-OUTPUT_FILE = 'data/angelone_support_urls.json'
+from data_processing.bloom_filter import BloomFilter
+from data_processing.url_filter import canonicalize_url
+
+OUTPUT_FILE = 'data/angelone_support_urls.txt'
 
 class UrlFinder(scrapy.Spider):
+    """
+    Crawl the support section recursively and write every support URL found.
+
+    Links are canonicalized (see `canonicalize_url`) before they are scheduled, so fragment,
+    language, query and trailing-slash variants of a page are fetched and written once. Seen
+    URLs are kept in Bloom filters rather than sets, and Scrapy's own duplicate filter is
+    bypassed, so memory stays small for hundreds of thousands of URLs.
+
+    Spider arguments (`-a name=value`):
+        max_depth: Links are followed up to this many hops from the start pages (default 10).
+            URLs found on pages at the limit are still written.
+        max_pages: Stop scheduling after this many pages (default 0, no limit)
+        use_sitemap: Also seed the crawl from the site's sitemap (default false)
+        capacity: Number of URLs the seen-set is sized for (default 1,000,000)
+        output_file, allowed_domains: Overrides for testing against another host
+    """
     name = 'angelone_support'
     allowed_domains = ['angelone.in']
     start_urls = ['https://www.angelone.in/support']
-    
+    sitemap_urls = ['https://www.angelone.in/sitemap.xml']
+    output_file = OUTPUT_FILE
+    max_depth = 10
+    max_pages = 0
+    use_sitemap = False
+    capacity = 1_000_000
+
     def __init__(self, *args, **kwargs):
         super(UrlFinder, self).__init__(*args, **kwargs)
-        self.found_urls: Set[str] = set()
-        self.base_url = 'https://www.angelone.in/support'
-    
+        # Spider arguments given with -a are strings.
+        self.max_depth = int(self.max_depth)
+        self.max_pages = int(self.max_pages)
+        self.capacity = int(self.capacity)
+        if isinstance(self.use_sitemap, str):
+            self.use_sitemap = self.use_sitemap.lower() in ('1', 'true', 'yes')
+        if isinstance(self.allowed_domains, str):
+            self.allowed_domains = self.allowed_domains.split(',')
+        if isinstance(self.start_urls, str):
+            self.start_urls = self.start_urls.split(',')
+        if isinstance(self.sitemap_urls, str):
+            self.sitemap_urls = self.sitemap_urls.split(',')
+
+        # URLs written, and URLs requested. They differ for URLs first found beyond the depth
+        # limit, which are still crawled if they are found again closer to the start pages.
+        self.found_urls = BloomFilter(self.capacity)
+        self.scheduled_urls = BloomFilter(self.capacity)
+        self.scheduled_pages = 0
+        # URLs are written as they are found, in discovery order.
+        os.makedirs(os.path.dirname(self.output_file) or '.', exist_ok=True)
+        self.output = open(self.output_file, 'w', encoding='utf-8')
+
+    def start_requests(self):
+        """
+        Schedule the start pages and, optionally, the sitemaps
+        """
+        for url in self.start_urls:
+            request = self.schedule(url, depth=0)
+            if request is not None:
+                yield request
+        if self.use_sitemap:
+            for url in self.sitemap_urls:
+                yield scrapy.Request(url, callback=self.parse_sitemap, dont_filter=True)
+
+    def schedule(self, url: str, depth: int) -> Optional[scrapy.Request]:
+        """
+        Record a URL if it is a new support page, and return a request for it while the
+        depth and page budgets allow.
+        """
+        canonical_url = canonicalize_url(url)
+        if canonical_url is None or not self.is_support_url(canonical_url):
+            return None
+        if self.found_urls.add(canonical_url):
+            self.output.write(canonical_url + '\n')
+
+        if depth > self.max_depth or (self.max_pages and self.scheduled_pages >= self.max_pages):
+            return None
+        if not self.scheduled_urls.add(canonical_url):
+            return None
+        self.scheduled_pages += 1
+        return scrapy.Request(canonical_url, callback=self.parse, meta={'link_depth': depth}, dont_filter=True)
+
+    def parse_sitemap(self, response) -> Generator:
+        """
+        Schedule the support pages of a sitemap, following sitemap indexes
+        """
+        body = gunzip(response.body) if response.body[:2] == b'\x1f\x8b' else response.body
+        try:
+            sitemap = Sitemap(body)
+        except Exception as e:
+            self.logger.warning(f'Could not parse sitemap {response.url}: {e}')
+            return
+        for entry in sitemap:
+            if sitemap.type == 'sitemapindex':
+                yield scrapy.Request(entry['loc'], callback=self.parse_sitemap, dont_filter=True)
+                continue
+            request = self.schedule(entry['loc'], depth=0)
+            if request is not None:
+                yield {'url': request.url, 'parent_url': None, 'found_on_page': response.url}
+                yield request
+
     def parse(self, response) -> Generator:
         """
         Main parsing method that extracts all links and follows them
         if they're under the support section.
         """
-        # Add current URL to found URLs
         current_url = response.url
-        self.found_urls.add(current_url)
-
-        yield {
-            'url': current_url,
-            'parent_url': None,
-            'found_on_page': current_url
-        }
-        
+        # A redirect target is the same page as the URL that was scheduled.
+        redirected_url = canonicalize_url(current_url)
+        if redirected_url:
+            self.scheduled_urls.add(redirected_url)
+        if not isinstance(response, TextResponse):
+            return
+
         # Log the current page being processed
         self.logger.info(f'Processing: {current_url}')
-        
+        depth = response.meta.get('link_depth', 0) + 1
+
         # Extract all links from the page
         links = response.css('a::attr(href)').getall()
-        
+
         for link in links:
-            # Convert relative URLs to absolute URLs
-            absolute_url = urljoin(response.url, link)
-            
-            # Check if the URL is under the support section
-            if self.is_support_url(absolute_url) and absolute_url not in self.found_urls:
-                self.found_urls.add(absolute_url)
-                
-                # Yield the URL as an item
-                yield {
-                    'url': absolute_url,
-                    'parent_url': current_url,
-                    'found_on_page': response.url
-                }
-                
-                # Follow the link to crawl it recursively
-                # yield response.follow(absolute_url, self.parse)
-    
+            # Convert relative URLs to absolute URLs, then schedule the new support pages
+            request = self.schedule(urljoin(current_url, link), depth)
+            if request is None:
+                continue
+
+            # Yield the URL as an item
+            yield {
+                'url': request.url,
+                'parent_url': current_url,
+                'found_on_page': response.url
+            }
+
+            # Follow the link to crawl it recursively
+            yield request
+
     def is_support_url(self, url: str) -> bool:
         """
         Check if the given URL is under the support section.
         """
         parsed_url = urlparse(url)
-        
-        # Check if it's from the same domain
-        if parsed_url.netloc not in ['www.angelone.in', 'angelone.in']:
+
+        # Check if it's from an allowed domain
+        host = parsed_url.hostname or ''
+        if not any(host == domain or host.endswith('.' + domain) for domain in self.allowed_domains):
             return False
-        
+
         # Check if the path starts with /support
         if not parsed_url.path.startswith('/support'):
             return False
-        
+
         # Exclude certain file types that might not be webpages
         excluded_extensions = ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.zip', '.rar']
         if any(parsed_url.path.lower().endswith(ext) for ext in excluded_extensions):
             return False
-        
+
         return True
-    
+
     def closed(self, reason):
         """
         Called when the spider closes. Print summary of found URLs.
         """
+        self.output.close()
         self.logger.info(f'Spider closed: {reason}')
         self.logger.info(f'Total URLs found: {len(self.found_urls)}')
-        
-        # Optionally, you can save all found URLs to a file
-        with open(OUTPUT_FILE, 'w') as f:
-            for url in sorted(self.found_urls):
-                f.write(f'{url}\n')
-        
-        self.logger.info('All URLs saved to angelone_support_urls.txt')
\ No newline at end of file
+        self.logger.info(f'Pages crawled: {self.scheduled_pages}')
+        self.logger.info(f'All URLs saved to {self.output_file}')
+
+
+if __name__ == '__main__':
+    import argparse
+    from data_processing.scraper import AngelOneSupportScraper
+
+    parser = argparse.ArgumentParser(description="Find the AngelOne support URLs.")
+    parser.add_argument("--max-depth", type=int, default=UrlFinder.max_depth)
+    parser.add_argument("--max-pages", type=int, default=0, help="Page budget (0 for no limit)")
+    parser.add_argument("--sitemap", action="store_true", help="Also seed the crawl from the sitemap")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    AngelOneSupportScraper(UrlFinder).run_spider(
+        'data/debug/angelone_support_pages.json',
+        spider_kwargs={
+            'max_depth': args.max_depth,
+            'max_pages': args.max_pages,
+            'use_sitemap': args.sitemap,
+            'output_file': args.output,
+        },
+    )
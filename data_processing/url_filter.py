@@ -1,5 +1,38 @@
-from urllib.parse import urlparse, urlunparse
-from typing import Set, List
+import re
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+from typing import Optional, Set, List
+
+# Language variants of the support pages, which duplicate the English content.
+LANGUAGE_VARIANTS = ('hindi',)
+# Query parameters that only track where a click came from.
+TRACKING_PARAMETERS = re.compile(r'^(utm_.*|gclid|fbclid|ref)$')
+CANONICAL_HOSTS = {'angelone.in': 'www.angelone.in'}
+
+def canonicalize_url(url: str) -> Optional[str]:
+    """
+    Return the canonical form of a support URL, or None for a language variant.
+
+    The fragment and tracking parameters are dropped, the remaining query parameters are
+    sorted, the scheme and host are lowercased (and the bare domain mapped to www), repeated
+    slashes are collapsed and a trailing slash is removed, so every spelling of a page maps
+    to one URL.
+    """
+    parsed = urlparse(url.strip())
+    path = re.sub(r'/{2,}', '/', parsed.path)
+    if any(f'/support/{language}/' in path + '/' for language in LANGUAGE_VARIANTS):
+        return None
+    if len(path) > 1:
+        path = path.rstrip('/')
+    host = (parsed.hostname or '').lower()
+    host = CANONICAL_HOSTS.get(host, host)
+    scheme = parsed.scheme.lower()
+    if parsed.port and (scheme, parsed.port) not in (('http', 80), ('https', 443)):
+        host = f'{host}:{parsed.port}'
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not TRACKING_PARAMETERS.match(key)
+    ))
+    return urlunparse((scheme, host, path or '/', '', query, ''))
 
 class AngelOneUrlFilter:
     """
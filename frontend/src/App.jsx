@@ -6,18 +6,28 @@ function App() {
   const [answer, setAnswer] = useState('')
   const [loading, setLoading] = useState(false)
 
-  const handleSubmit = async (e) => {
+  const handleSubmit = (e) => {
     e.preventDefault()
     setLoading(true)
-    try {
-      const response = await fetch('http://127.0.0.1:8000/get_answer?query=' + encodeURIComponent(question))
-      const data = await response.json()
-      setAnswer(data.answer)
-    } catch (error) {
-      console.error('Error:', error)
+    setAnswer('')
+    const source = new EventSource('http://127.0.0.1:8000/get_answer/stream?query=' + encodeURIComponent(question))
+    source.addEventListener('token', (event) => {
+      const data = JSON.parse(event.data)
+      setAnswer((previous) => previous + data.text)
+    })
+    source.addEventListener('sources', () => {
+      source.close()
+      setLoading(false)
+    })
+    const fail = (event) => {
+      console.error('Error:', event)
+      source.close()
       setAnswer('Error occurred while fetching the answer')
+      setLoading(false)
     }
-    setLoading(false)
+    // 'failed' is sent by the backend when answering fails; 'error' is the connection failing.
+    source.addEventListener('failed', fail)
+    source.addEventListener('error', fail)
   }
 
   return (
@@ -1,7 +1,39 @@
-from fastapi import FastAPI
-from rag.rag import getAnswer
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+from fastapi import FastAPI, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from rag.embedding_cache import query_embedding_cache
+from rag.metrics import render_metrics
+from rag.rag import answer_cache, answerQueryAsync, faq_index, readiness, registry, router, streamAnswerAsync, warmUp, warm_up_status
+from rag.single_flight import single_flight
+
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_up_done(task: asyncio.Task) -> None:
+    # Without this, a failed warm-up is only reported when the task is garbage collected.
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        warm_up_status["error"] = f"{type(exc).__name__}: {exc}"
+        logger.error("RAG warm-up failed", exc_info=exc)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the RAG engines in the background so /ready can report progress while they load.
+    warm_up_task = asyncio.create_task(asyncio.to_thread(warmUp))
+    warm_up_task.add_done_callback(_warm_up_done)
+    yield
+    warm_up_task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -14,6 +46,59 @@ app.add_middleware(
 )
 
 
+@app.get("/ready")
+def ready(response: Response):
+    status = readiness()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+
+@app.get("/stats")
+def stats():
+    return {
+        "warm_up": dict(warm_up_status),
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "answer_cache": answer_cache.stats(),
+        "router": router.stats(),
+        "faq_fast_path": faq_index.stats(),
+        "context": {name: engine.context_packer.stats() for name, engine in registry.engines.items()},
+        "metadata_filters": {name: engine.filter_stats() for name, engine in registry.engines.items()},
+        "batching": {name: engine.batch_stats() for name, engine in registry.engines.items()},
+        "single_flight": single_flight.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text exposition format.
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/get_answer")
-def get_answer(query: str):
-    return {"answer": getAnswer(query)}
\ No newline at end of file
+async def get_answer(query: str):
+    result = await answerQueryAsync(query)
+    return {"answer": result.answer, "answered_by": result.answered_by}
+
+
+def _format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/get_answer/stream")
+async def get_answer_stream(query: str):
+    async def event_stream():
+        try:
+            async for event in streamAnswerAsync(query):
+                event = dict(event)
+                name = event.pop("type")
+                yield _format_sse(name, event)
+        except Exception as e:
+            # Not "error": EventSource also fires that name for connection failures.
+            yield _format_sse("failed", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,203 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from rag.embedding_cache import QueryEmbeddingCache
+from rag.store_version import read_build_id
+
+load_dotenv()
+
+
+class SemanticAnswerCache:
+    """
+    A cache of generated answers looked up by query-embedding similarity.
+
+    A new query is served from the cache when the cosine similarity between its embedding
+    and the embedding of a cached query is at least `threshold`, and both were routed to the
+    same corpus with the same scope. The scope holds whatever the embedding cannot be trusted
+    to separate, like the plans and chunk type a query names: "the deductible on the Gold
+    plan" and "on the Bronze plan" embed almost identically but need different answers.
+    Entries expire after `ttl_seconds` and the least recently used entries are evicted beyond
+    `max_entries`.
+
+    Each entry remembers the build id of its corpus's vector store. When
+    VectorStore.create_vector_store rebuilds a store, it writes a new build id and every
+    entry for that corpus is dropped on the next lookup.
+    """
+
+    def __init__(
+        self,
+        corpus_directories: Dict[str, str],
+        threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries: int = 1024,
+        version_check_interval: float = 5.0,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            corpus_directories (Dict[str, str]): Mapping of corpus name to vector store directory
+            threshold (float): Minimum cosine similarity for a cached answer to be reused
+            ttl_seconds (float): Time after which an entry expires
+            max_entries (int): Maximum number of cached answers across all corpora
+            version_check_interval (float): Seconds between checks for rebuilt vector stores
+        """
+        self.corpus_directories = corpus_directories
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version_check_interval = version_check_interval
+
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Per (corpus, scope): the entry keys and their stacked, normalized embeddings; rebuilt
+        # lazily after changes.
+        self._matrices: Dict[Tuple[str, str], Tuple[List[Tuple[str, str, str]], np.ndarray]] = {}
+        self._build_ids = {name: read_build_id(path) for name, path in corpus_directories.items()}
+        self._last_version_check = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, corpus: str, embedding: List[float], scope: str = "") -> Optional[Dict[str, Any]]:
+        """
+        Find a cached answer for a query embedding.
+
+        Args:
+            corpus (str): Name of the corpus the query was routed to
+            embedding (List[float]): Embedding of the new query
+            scope (str): Scope of the query within the corpus, see the class docstring
+
+        Returns:
+            Optional[Dict[str, Any]]: The cached entry (answer, corpus, sources, query and
+            similarity), or None if no cached query is similar enough
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            self._check_versions()
+            self._expire()
+            if not self._matrices and self._entries:
+                grouped: Dict[Tuple[str, str], List[Tuple[str, str, str]]] = {}
+                for key in self._entries:
+                    grouped.setdefault(key[:2], []).append(key)
+                self._matrices = {
+                    group: (keys, np.stack([self._entries[key]["vector"] for key in keys]))
+                    for group, keys in grouped.items()
+                }
+            group = self._matrices.get((corpus, scope))
+            if group is None:
+                self.misses += 1
+                return None
+
+            keys, matrix = group
+            similarities = matrix @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            key = keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            entry = self._entries[key]
+            return {
+                "answer": entry["answer"],
+                "corpus": entry["corpus"],
+                "sources": entry["sources"],
+                "query": entry["query"],
+                "similarity": float(similarities[best]),
+            }
+
+    def put(self, corpus: str, query: str, embedding: List[float], answer: str, sources: List[str], scope: str = "") -> None:
+        """
+        Cache the answer generated for a query.
+
+        Args:
+            corpus (str): Name of the corpus the answer was generated from
+            query (str): The query text
+            embedding (List[float]): Embedding of the query
+            answer (str): The generated answer
+            sources (List[str]): Sources of the documents the answer was generated from
+            scope (str): Scope of the query within the corpus, see the class docstring
+        """
+        key = (corpus, scope, QueryEmbeddingCache.normalize(query))
+        with self._lock:
+            self._entries[key] = {
+                "corpus": corpus,
+                "query": query,
+                "vector": self._normalize(embedding),
+                "answer": answer,
+                "sources": sources,
+                "created_at": time.monotonic(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._matrices = {}
+
+    def invalidate(self, corpus: Optional[str] = None) -> None:
+        """Drop every cached answer, or only those of one corpus."""
+        with self._lock:
+            self._invalidate(corpus)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _invalidate(self, corpus: Optional[str]) -> None:
+        for key in [key for key in self._entries if corpus is None or key[0] == corpus]:
+            del self._entries[key]
+        self._matrices = {}
+        self.invalidations += 1
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [key for key, entry in self._entries.items() if entry["created_at"] < cutoff]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrices = {}
+
+    def _check_versions(self) -> None:
+        now = time.monotonic()
+        if now - self._last_version_check < self.version_check_interval:
+            return
+        self._last_version_check = now
+        for name, path in self.corpus_directories.items():
+            build_id = read_build_id(path)
+            if build_id != self._build_ids.get(name):
+                self._build_ids[name] = build_id
+                self._invalidate(name)
+
+
+def create_answer_cache(corpus_directories: Dict[str, str]) -> SemanticAnswerCache:
+    """Create an answer cache configured from ANSWER_CACHE_* environment variables."""
+    return SemanticAnswerCache(
+        corpus_directories,
+        threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+        ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600")),
+        max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024")),
+    )
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Generic, List, Optional, Set, Tuple, TypeVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+Item = TypeVar("Item")
+Result = TypeVar("Result")
+
+
+class MicroBatcher(Generic[Item, Result]):
+    """
+    Group calls arriving within a short window into one batched call.
+
+    `submit` queues an item and waits for its result. A batch is sent to `process_batch` once
+    `window_seconds` have passed since its first item, or as soon as it holds `max_batch_size`
+    items. `process_batch` returns one result per item, in order; if it raises, every caller
+    in the batch gets the exception. With a window of 0 each item is processed on its own.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Item]], Awaitable[List[Result]]],
+        window_seconds: float = 0.002,
+        max_batch_size: int = 32,
+    ):
+        """
+        Initialize the batcher.
+
+        Args:
+            process_batch (Callable[[List[Item]], Awaitable[List[Result]]]): Processes a batch of items
+            window_seconds (float): How long a batch waits for more items after its first
+            max_batch_size (int): Largest number of items sent in one batch
+        """
+        self.process_batch = process_batch
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self._pending: List[Tuple[Item, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes: Dict[int, int] = {}
+
+    async def submit(self, item: Item) -> Result:
+        """Queue an item for the next batch and return its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if self.window_seconds <= 0 or len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_seconds, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # Keep a reference so the task is not garbage collected while it runs.
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Item, asyncio.Future]]) -> None:
+        with self._lock:
+            self.batches += 1
+            self.items += len(batch)
+            self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        except BaseException:
+            for _, future in batch:
+                future.cancel()
+            raise
+        for (_, future), result in zip(batch, results):
+            # A caller that was cancelled has stopped waiting for its result.
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of batches sent and the batch sizes achieved."""
+        with self._lock:
+            return {
+                "window_ms": self.window_seconds * 1000,
+                "max_batch_size": self.max_batch_size,
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            }
+
+
+# Window and size of the batches of query embeddings and vector searches made by each RAG engine.
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "2"))
+QUERY_BATCH_MAX_SIZE = int(os.getenv("QUERY_BATCH_MAX_SIZE", "32"))
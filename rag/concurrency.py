@@ -0,0 +1,16 @@
+import asyncio
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Maximum number of in-flight calls per upstream, shared by every request on the event loop.
+# Override with environment variables, e.g. LLM_MAX_CONCURRENCY=64.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "32"))
+VECTOR_SEARCH_MAX_CONCURRENCY = int(os.getenv("VECTOR_SEARCH_MAX_CONCURRENCY", "8"))
+
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+embedding_semaphore = asyncio.Semaphore(EMBEDDING_MAX_CONCURRENCY)
+# Chroma queries are blocking and run in worker threads, so this also caps threadpool usage.
+vector_search_semaphore = asyncio.Semaphore(VECTOR_SEARCH_MAX_CONCURRENCY)
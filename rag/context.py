@@ -0,0 +1,187 @@
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import tiktoken
+from langchain_core.documents import Document
+from pydantic import BaseModel, ConfigDict
+
+PLAN_DETAILS_FILE = "plan_details.json"
+# Heads the plan details at the top of the prompt's context.
+PLAN_DETAILS_HEADER = "Plan Details:\n"
+
+
+class PackedContext(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    documents: List[Document]
+    tokens: int
+    duplicates_dropped: int
+    over_budget_dropped: int
+
+
+def approximate_token_count(text: str) -> int:
+    """Estimate the tokens of English text at about four characters per token, rounding up."""
+    return (len(text) + 3) // 4
+
+
+def _load_encoding(model: str) -> Optional["tiktoken.Encoding"]:
+    """Return the tiktoken encoding of a model, or None when it cannot be loaded."""
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use; offline, without TIKTOKEN_CACHE_DIR, that fails.
+        print(f"Token counts for {model} are approximate: its tiktoken encoding could not be loaded ({e})")
+        return None
+
+
+class ContextPacker:
+    """
+    Select the retrieved documents that go into the prompt.
+
+    Documents are taken in relevance order. A document is dropped when its text is an exact
+    duplicate of one already taken, or a near duplicate (Jaccard similarity of word shingles at
+    least `near_duplicate_threshold`). Only documents of the same plan are compared: chunks of
+    different plans often differ only in their plan name, and a question comparing plans needs
+    each of them. Remaining documents are added while their token count
+    for `model` fits in `token_budget`. When the model's tiktoken encoding is neither cached nor
+    downloadable, tokens are estimated from the text length instead.
+
+    With `plan_details`, the first document referencing a plan is also charged for the line
+    describing that plan, since the prompt includes it once per distinct plan.
+    """
+
+    def __init__(self, model: str, token_budget: Optional[int] = None, near_duplicate_threshold: float = 0.85, shingle_size: int = 5):
+        """
+        Initialize the packer.
+
+        Args:
+            model (str): Model the prompt is sent to, used to pick the tokenizer
+            token_budget (Optional[int]): Maximum tokens of document text in the prompt, or None for no limit
+            near_duplicate_threshold (float): Shingle Jaccard similarity above which a document is a duplicate
+            shingle_size (int): Number of words per shingle
+        """
+        self.model = model
+        self.token_budget = token_budget
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.shingle_size = shingle_size
+        self.encoding = _load_encoding(model)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.total_tokens = 0
+        self.max_tokens = 0
+        self.duplicates_dropped = 0
+        self.over_budget_dropped = 0
+
+    def count_tokens(self, text: str) -> int:
+        if self.encoding is None:
+            return approximate_token_count(text)
+        return len(self.encoding.encode(text))
+
+    def _shingles(self, text: str) -> Set[str]:
+        words = re.findall(r'\w+', text.lower())
+        if len(words) <= self.shingle_size:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def pack(self, documents: List[Document], plan_details: Optional[Dict[str, Dict[str, Any]]] = None) -> PackedContext:
+        """
+        Pack documents into the token budget.
+
+        Args:
+            documents (List[Document]): Retrieved documents, most relevant first
+            plan_details (Optional[Dict[str, Dict[str, Any]]]): Plan details added to the prompt for the packed documents
+
+        Returns:
+            PackedContext: The selected documents and the tokens they use, plan details included
+        """
+        plan_details = plan_details or {}
+        packed = []
+        packed_shingles: List[Tuple[Optional[str], Set[str]]] = []
+        described_plans: Set[str] = set()
+        tokens = 0
+        duplicates = 0
+        over_budget = 0
+        for document in documents:
+            shingles = self._shingles(document.page_content)
+            if any(
+                other_plan == document.metadata.get("plan") and len(shingles & other) / len(shingles | other) >= self.near_duplicate_threshold
+                for other_plan, other in packed_shingles
+            ):
+                duplicates += 1
+                continue
+
+            document_tokens = self.count_tokens(document.page_content)
+            plan = document.metadata.get("plan")
+            if plan in plan_details and plan not in described_plans:
+                # The header is counted with the first plan described.
+                header = "" if described_plans else PLAN_DETAILS_HEADER
+                document_tokens += self.count_tokens(header + format_plan(plan, plan_details[plan]))
+            else:
+                plan = None
+            if self.token_budget is not None and tokens + document_tokens > self.token_budget:
+                # A shorter, less relevant document may still fit.
+                over_budget += 1
+                continue
+
+            packed.append(document)
+            packed_shingles.append((document.metadata.get("plan"), shingles))
+            if plan is not None:
+                described_plans.add(plan)
+            tokens += document_tokens
+
+        with self._lock:
+            self.requests += 1
+            self.total_tokens += tokens
+            self.max_tokens = max(self.max_tokens, tokens)
+            self.duplicates_dropped += duplicates
+            self.over_budget_dropped += over_budget
+        return PackedContext(documents=packed, tokens=tokens, duplicates_dropped=duplicates, over_budget_dropped=over_budget)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the context tokens used per request and how many documents were dropped."""
+        with self._lock:
+            return {
+                "token_budget": self.token_budget,
+                "approximate_tokens": self.encoding is None,
+                "requests": self.requests,
+                "avg_tokens": round(self.total_tokens / self.requests, 1) if self.requests else 0.0,
+                "max_tokens": self.max_tokens,
+                "duplicates_dropped": self.duplicates_dropped,
+                "over_budget_dropped": self.over_budget_dropped,
+            }
+
+
+def load_plan_details(directory: str) -> Dict[str, Dict[str, Any]]:
+    """Load the plan-level details stored next to a vector store, if it has any."""
+    path = os.path.join(directory, PLAN_DETAILS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def format_plan(plan: str, details: Dict[str, Any]) -> str:
+    """Describe one plan in a line of the prompt's plan details."""
+    return (
+        f"Plan: {plan}: {details.get('plan details')} "
+        f"(coverage for: {details.get('coverage for')}, plan type: {details.get('plan type')})"
+    )
+
+
+def format_plan_details(documents: List[Document], plan_details: Dict[str, Dict[str, Any]]) -> str:
+    """Describe each distinct plan referenced by the documents once, in order of first reference."""
+    lines = []
+    seen = set()
+    for document in documents:
+        plan = document.metadata.get("plan")
+        if plan in plan_details and plan not in seen:
+            seen.add(plan)
+            lines.append(format_plan(plan, plan_details[plan]))
+    return "\n".join(lines)
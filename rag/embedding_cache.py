@@ -0,0 +1,169 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class QueryEmbeddingCache:
+    """
+    An LRU cache of query embeddings with an optional persistent sqlite tier.
+
+    Entries are keyed on the embedding model name and the normalized query text, so
+    "How can I withdraw my money?" and "how can i  withdraw my money" share one entry.
+    The in-memory tier holds up to `max_size` entries. When `path` is set, every embedding
+    is also written to disk and memory misses are looked up there before calling the API.
+    Async callers use `aget` and `aput`, which run the sqlite reads and writes in a worker
+    thread instead of on the event loop.
+    """
+
+    def __init__(self, max_size: int = 4096, path: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size (int): Maximum number of embeddings kept in memory
+            path (Optional[str]): Path of the sqlite file backing the persistent tier
+        """
+        self.max_size = max_size
+        self.path = path
+        self._entries: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # The sqlite tier has its own lock, so a slow disk lookup never holds up memory hits.
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings "
+                "(model TEXT NOT NULL, query TEXT NOT NULL, vector BLOB NOT NULL, PRIMARY KEY (model, query))"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalize query text by lowercasing, collapsing whitespace and dropping trailing punctuation."""
+        text = re.sub(r'\s+', ' ', text.strip().lower())
+        return text.rstrip('?!. ')
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """
+        Look up the embedding of a query.
+
+        Args:
+            model (str): Name of the embedding model
+            text (str): The query text
+
+        Returns:
+            Optional[List[float]]: The cached embedding, or None on a miss
+        """
+        key = (model, self.normalize(text))
+        embedding = self._get_from_memory(key)
+        if embedding is None and self._db is not None:
+            embedding = self._get_from_disk(key)
+        if embedding is None:
+            self._count_miss()
+        return embedding
+
+    async def aget(self, model: str, text: str) -> Optional[List[float]]:
+        """Look up the embedding of a query, reading the sqlite tier off the event loop."""
+        key = (model, self.normalize(text))
+        embedding = self._get_from_memory(key)
+        if embedding is None and self._db is not None:
+            embedding = await asyncio.to_thread(self._get_from_disk, key)
+        if embedding is None:
+            self._count_miss()
+        return embedding
+
+    def put(self, model: str, text: str, embedding: List[float]) -> None:
+        """
+        Store the embedding of a query.
+
+        Args:
+            model (str): Name of the embedding model
+            text (str): The query text
+            embedding (List[float]): The embedding returned by the model
+        """
+        key = (model, self.normalize(text))
+        with self._lock:
+            self._insert(key, embedding)
+        if self._db is not None:
+            self._put_on_disk(key, embedding)
+
+    async def aput(self, model: str, text: str, embedding: List[float]) -> None:
+        """Store the embedding of a query, writing the sqlite tier off the event loop."""
+        key = (model, self.normalize(text))
+        with self._lock:
+            self._insert(key, embedding)
+        if self._db is not None:
+            await asyncio.to_thread(self._put_on_disk, key, embedding)
+
+    def _get_from_memory(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            return embedding
+
+    def _get_from_disk(self, key: Tuple[str, str]) -> Optional[List[float]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT vector FROM query_embeddings WHERE model = ? AND query = ?", key
+            ).fetchone()
+        if row is None:
+            return None
+        embedding = array('f', row[0]).tolist()
+        with self._lock:
+            self._insert(key, embedding)
+            self.disk_hits += 1
+        return embedding
+
+    def _put_on_disk(self, key: Tuple[str, str], embedding: List[float]) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO query_embeddings (model, query, vector) VALUES (?, ?, ?)",
+                (*key, array('f', embedding).tobytes()),
+            )
+            self._db.commit()
+
+    def _count_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def _insert(self, key: Tuple[str, str], embedding: List[float]) -> None:
+        self._entries[key] = embedding
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Shared by every RAG engine in the process. Set EMBEDDING_CACHE_PATH to enable the disk tier.
+query_embedding_cache = QueryEmbeddingCache(
+    max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "4096")),
+    path=os.getenv("EMBEDDING_CACHE_PATH"),
+)
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+DIGEST_SIZE = 32
+
+
+class EmbeddingStore:
+    """
+    A persistent, content-addressed store of document embeddings.
+
+    Embeddings are keyed by (model, sha256(text)). Each model has three files in `directory`:
+    `<model>.vectors`, an append-only file of float32 rows; `<model>.index`, an append-only file
+    of 32-byte sha256 digests where record i names row i; and `<model>.json`, holding the
+    vector dimension. A crash during or between the two appends leaves rows, possibly partial,
+    without index records; they are ignored and overwritten by the next append.
+    """
+
+    def __init__(self, directory: str = "data/embedding_store"):
+        """
+        Initialize the store.
+
+        Args:
+            directory (str): Directory holding the store's files
+        """
+        self.directory = directory
+        self._indexes: Dict[str, Dict[bytes, int]] = {}
+        self._dimensions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(text: str) -> bytes:
+        return hashlib.sha256(text.encode('utf-8')).digest()
+
+    def _path(self, model: str, suffix: str) -> str:
+        return os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_.-]', '_', model) + suffix)
+
+    def _load(self, model: str) -> Dict[bytes, int]:
+        """Load the digest -> row index of a model, reading it from disk on first use."""
+        index = self._indexes.get(model)
+        if index is not None:
+            return index
+
+        index = {}
+        if os.path.exists(self._path(model, ".json")):
+            with open(self._path(model, ".json"), 'r', encoding='utf-8') as f:
+                self._dimensions[model] = json.load(f)["dimension"]
+            rows = os.path.getsize(self._path(model, ".vectors")) // (4 * self._dimensions[model])
+            with open(self._path(model, ".index"), 'rb') as f:
+                data = f.read()
+            for row in range(min(rows, len(data) // DIGEST_SIZE)):
+                index[data[row * DIGEST_SIZE:(row + 1) * DIGEST_SIZE]] = row
+        self._indexes[model] = index
+        return index
+
+    def _vectors(self, model: str, rows: int) -> np.ndarray:
+        # Only indexed rows are mapped; an interrupted append may have left a partial row after them.
+        return np.memmap(self._path(model, ".vectors"), dtype=np.float32, mode='r', shape=(rows, self._dimensions[model]))
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up the embeddings of several texts.
+
+        Args:
+            model (str): Name of the embedding model
+            texts (List[str]): The texts to look up
+
+        Returns:
+            List[Optional[List[float]]]: The embedding of each text, or None where it is missing
+        """
+        with self._lock:
+            index = self._load(model)
+            rows = [index.get(self.digest(text)) for text in texts]
+            if all(row is None for row in rows):
+                return [None] * len(texts)
+
+            vectors = self._vectors(model, len(index))
+            return [vectors[row].tolist() if row is not None else None for row in rows]
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]) -> None:
+        """
+        Store the embeddings of several texts. Texts that are already stored are skipped.
+
+        Args:
+            model (str): Name of the embedding model
+            texts (List[str]): The embedded texts
+            embeddings (List[List[float]]): The embedding of each text
+        """
+        with self._lock:
+            index = self._load(model)
+            new = {}
+            for text, embedding in zip(texts, embeddings):
+                digest = self.digest(text)
+                if digest not in index:
+                    new[digest] = embedding
+            if not new:
+                return
+
+            os.makedirs(self.directory, exist_ok=True)
+            if model not in self._dimensions:
+                self._dimensions[model] = len(next(iter(new.values())))
+                with open(self._path(model, ".json"), 'w', encoding='utf-8') as f:
+                    json.dump({"model": model, "dimension": self._dimensions[model]}, f)
+
+            # Truncate any row left behind by an interrupted append before writing new rows.
+            rows = len(index)
+            with open(self._path(model, ".vectors"), 'ab') as f:
+                f.truncate(rows * 4 * self._dimensions[model])
+                f.write(np.asarray(list(new.values()), dtype=np.float32).tobytes())
+            with open(self._path(model, ".index"), 'ab') as f:
+                f.truncate(rows * DIGEST_SIZE)
+                f.write(b"".join(new.keys()))
+            for row, digest in enumerate(new, start=rows):
+                index[digest] = row
+
+    def gc(self, model: str, referenced_texts: Iterable[str]) -> Dict[str, int]:
+        """
+        Compact a model's files, dropping vectors whose text is no longer referenced.
+
+        Args:
+            model (str): Name of the embedding model
+            referenced_texts (Iterable[str]): Every text still stored in some vector store
+
+        Returns:
+            Dict[str, int]: Number of vectors kept and dropped
+        """
+        referenced = {self.digest(text) for text in referenced_texts}
+        with self._lock:
+            index = self._load(model)
+            keep = [(digest, row) for digest, row in sorted(index.items(), key=lambda item: item[1]) if digest in referenced]
+            if len(keep) == len(index):
+                return {"kept": len(keep), "dropped": 0}
+
+            dimension = self._dimensions[model]
+            vectors = self._vectors(model, len(index))
+            kept_vectors = vectors[[row for _, row in keep]] if keep else np.zeros((0, dimension), dtype=np.float32)
+            with open(self._path(model, ".vectors") + ".tmp", 'wb') as f:
+                f.write(np.ascontiguousarray(kept_vectors).tobytes())
+            with open(self._path(model, ".index") + ".tmp", 'wb') as f:
+                f.write(b"".join(digest for digest, _ in keep))
+            del vectors
+            os.replace(self._path(model, ".vectors") + ".tmp", self._path(model, ".vectors"))
+            os.replace(self._path(model, ".index") + ".tmp", self._path(model, ".index"))
+            self._indexes[model] = {digest: row for row, (digest, _) in enumerate(keep)}
+            return {"kept": len(keep), "dropped": len(index) - len(keep)}
+
+
+class StoreBackedEmbeddings(Embeddings):
+    """
+    Embeddings that read document vectors from an EmbeddingStore before calling the wrapped model.
+
+    Only texts missing from the store are sent to the model, and their vectors are added to it.
+    Queries are passed straight through.
+    """
+
+    def __init__(self, embeddings: Embeddings, store: EmbeddingStore):
+        self.embeddings = embeddings
+        self.store = store
+        self.model = embeddings.model
+        # Batches are embedded from several threads at once.
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.store.get_many(self.model, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            embedded = self.embeddings.embed_documents(missing_texts)
+            self.store.put_many(self.model, missing_texts, embedded)
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,193 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.embedding_cache import QueryEmbeddingCache
+from rag.store_version import read_build_id
+
+FAQ_INDEX_FILE = "faq_index.json"
+FAQ_VECTORS_FILE = "faq_questions.npy"
+
+
+def build_faq_index(faq_entries: List[Dict[str, Any]], embeddings: Embeddings, output_directory: str) -> int:
+    """
+    Build the lookup index of FAQ questions used to answer near-verbatim questions directly.
+
+    Questions are grouped by their normalized text; each group keeps the first answer and every
+    URL the question appears on. The question embeddings are stored alongside for
+    high-similarity matching.
+
+    Args:
+        faq_entries (List[Dict[str, Any]]): Entries of angelone_faq_pairs.json ({"url", "faq_pairs"})
+        embeddings (Embeddings): Model used to embed the questions; must match the query model
+        output_directory (str): Directory to write the index into (the AngelOne vector store)
+
+    Returns:
+        int: Number of distinct questions in the index
+    """
+    questions: Dict[str, Dict[str, Any]] = {}
+    for entry in faq_entries:
+        for faq in entry['faq_pairs']:
+            key = QueryEmbeddingCache.normalize(faq['question'])
+            if key not in questions:
+                questions[key] = {"question": faq['question'], "answer": faq['answer'], "urls": []}
+            if entry['url'] not in questions[key]["urls"]:
+                questions[key]["urls"].append(entry['url'])
+
+    records = [{"key": key, **record} for key, record in questions.items()]
+    vectors = np.asarray(embeddings.embed_documents([record["question"] for record in records]), dtype=np.float32)
+    if len(records):
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+    os.makedirs(output_directory, exist_ok=True)
+    np.save(os.path.join(output_directory, FAQ_VECTORS_FILE), vectors)
+    with open(os.path.join(output_directory, FAQ_INDEX_FILE), 'w', encoding='utf-8') as f:
+        json.dump(records, f, indent=2, ensure_ascii=False)
+    print(f"FAQ index: {len(records)} questions written to {output_directory}")
+    return len(records)
+
+
+class FAQIndex:
+    """
+    Answer questions that match a stored FAQ question exactly or almost exactly.
+
+    A query matches when its normalized text equals a stored question, or when the cosine
+    similarity between its embedding and a stored question's embedding is at least `threshold`.
+    Only queries routed to `corpus`, the corpus the FAQ belongs to, are looked up.
+
+    Once loaded, the index is reloaded when the build id of `directory` changes, like the
+    answer cache invalidates the answers of a rebuilt store.
+    """
+
+    def __init__(self, directory: str, corpus: str, threshold: float = 0.97, version_check_interval: float = 5.0):
+        """
+        Initialize the index.
+
+        Args:
+            directory (str): Directory holding the files written by build_faq_index
+            corpus (str): Name of the corpus stored in `directory`
+            threshold (float): Minimum cosine similarity for a high-similarity match
+            version_check_interval (float): Seconds between checks for a rebuilt index
+        """
+        self.directory = directory
+        self.corpus = corpus
+        self.threshold = threshold
+        self.version_check_interval = version_check_interval
+        self.records: List[Dict[str, Any]] = []
+        self.keys: Dict[str, int] = {}
+        self.vectors: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+        self._build_id: Optional[str] = None
+        # None until load() has run; the version is only checked after that.
+        self._last_version_check: Optional[float] = None
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.vectors is not None
+
+    def load(self) -> None:
+        """Load the index from disk; without an index every lookup misses."""
+        # Read before the files, so a rebuild finishing during the load is picked up later.
+        build_id = read_build_id(self.directory)
+        path = os.path.join(self.directory, FAQ_INDEX_FILE)
+        records: List[Dict[str, Any]] = []
+        vectors = None
+        if not os.path.exists(path):
+            print(f"FAQ fast path disabled: {path} not found, rebuild the vector store to create it")
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            vectors = np.load(os.path.join(self.directory, FAQ_VECTORS_FILE))
+            if len(vectors) != len(records):
+                # The two files are being rewritten; the next build id change loads them again.
+                print(f"FAQ fast path disabled: {path} and its vectors do not match")
+                records, vectors = [], None
+            else:
+                print(f"FAQ fast path loaded {len(records)} questions")
+
+        with self._lock:
+            self.records = records
+            self.keys = {record["key"]: i for i, record in enumerate(records)}
+            self.vectors = vectors
+            self._build_id = build_id
+            self._last_version_check = time.monotonic()
+
+    def _check_version(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._last_version_check is None or now - self._last_version_check < self.version_check_interval:
+                return
+            self._last_version_check = now
+            if read_build_id(self.directory) == self._build_id:
+                return
+            self.reloads += 1
+        self.load()
+
+    def lookup(self, query: str, embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """
+        Find the stored FAQ a query asks for.
+
+        Args:
+            query (str): The query text
+            embedding (List[float]): Embedding of the query
+
+        Returns:
+            Optional[Dict[str, Any]]: The question, answer, urls, match type and similarity,
+            or None if no stored question is close enough
+        """
+        self._check_version()
+        with self._lock:
+            records, keys, vectors = self.records, self.keys, self.vectors
+        if vectors is None or not records:
+            return None
+
+        match, similarity = "exact", 1.0
+        row = keys.get(QueryEmbeddingCache.normalize(query))
+        if row is None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            similarities = vectors @ (vector / (np.linalg.norm(vector) or 1.0))
+            row = int(np.argmax(similarities))
+            match, similarity = "similar", float(similarities[row])
+            if similarity < self.threshold:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+        with self._lock:
+            if match == "exact":
+                self.exact_hits += 1
+            else:
+                self.similar_hits += 1
+        record = records[row]
+        return {
+            "question": record["question"],
+            "answer": record["answer"],
+            "urls": record["urls"],
+            "match": match,
+            "similarity": similarity,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how often queries were answered from the index."""
+        with self._lock:
+            lookups = self.exact_hits + self.similar_hits + self.misses
+            return {
+                "questions": len(self.records),
+                "threshold": self.threshold,
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,269 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from rag.store_version import read_build_id
+
+FLAT_INDEX_DIRECTORY = "flat_index"
+
+
+def export_flat_index(persist_directory: str, output_directory: Optional[str] = None) -> str:
+    """
+    Dump the embeddings and documents of a Chroma vector store into a flat, memory-mappable index.
+
+    The index directory holds `vectors.npy` (unit-normalized float32 rows), `vectors_int8.npy`
+    and `scales.npy` (per-row symmetric int8 quantization of the same rows), `documents.jsonl`
+    (one document per row) and `meta.json`.
+
+    Args:
+        persist_directory (str): Directory of the Chroma vector store
+        output_directory (Optional[str]): Where to write the index, by default inside the store
+
+    Returns:
+        str: The directory the index was written to
+    """
+    from langchain_chroma import Chroma
+
+    output_directory = output_directory or os.path.join(persist_directory, FLAT_INDEX_DIRECTORY)
+    os.makedirs(output_directory, exist_ok=True)
+
+    data = Chroma(persist_directory=persist_directory).get(include=["embeddings", "documents", "metadatas"])
+    vectors = np.asarray(data["embeddings"], dtype=np.float32)
+    # An empty store gives a 1-D array; keep the index two-dimensional.
+    vectors = vectors.reshape(len(data["ids"]), -1) if len(data["ids"]) else np.zeros((0, 0), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors = vectors / norms
+
+    scales = np.abs(vectors).max(axis=1, initial=0.0) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+
+    np.save(os.path.join(output_directory, "vectors.npy"), vectors)
+    np.save(os.path.join(output_directory, "vectors_int8.npy"), quantized)
+    np.save(os.path.join(output_directory, "scales.npy"), scales.astype(np.float32))
+    with open(os.path.join(output_directory, "documents.jsonl"), 'w', encoding='utf-8') as f:
+        for doc_id, content, metadata in zip(data["ids"], data["documents"], data["metadatas"]):
+            f.write(json.dumps({"id": doc_id, "page_content": content, "metadata": metadata or {}}, ensure_ascii=False) + "\n")
+    with open(os.path.join(output_directory, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump({
+            "count": int(vectors.shape[0]),
+            "dimension": int(vectors.shape[1]) if vectors.size else 0,
+            "source_build_id": read_build_id(persist_directory),
+        }, f, indent=2)
+
+    print(f"Exported {vectors.shape[0]} vectors from {persist_directory} to {output_directory}")
+    return output_directory
+
+
+def matches_filter(metadata: Dict[str, Any], where: Dict[str, Any]) -> bool:
+    """
+    Evaluate a Chroma `where` filter against a document's metadata.
+
+    Supports `$and`, `$or`, plain equality and the `$eq`, `$ne`, `$in` and `$nin` operators.
+    """
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            for operator, operand in condition.items():
+                if operator == "$eq":
+                    matched = value == operand
+                elif operator == "$ne":
+                    matched = value != operand
+                elif operator == "$in":
+                    matched = value in operand
+                elif operator == "$nin":
+                    matched = value not in operand
+                else:
+                    raise ValueError(f"Unsupported filter operator: {operator}")
+                if not matched:
+                    return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class FlatIndex:
+    """
+    Exact top-k retrieval over a memory-mapped float32 matrix.
+
+    The matrix is opened with mmap, so every process serving the same index shares one copy
+    of its pages through the OS page cache. With `quantized=True`, candidates are scored on the
+    int8 copy first and the best `k * oversample` are re-scored exactly against the float rows.
+
+    Metadata filters are evaluated on per-field arrays of value codes built at load time, so a
+    filtered search does not visit the documents one by one.
+    """
+
+    def __init__(self, directory: str, quantized: bool = False, oversample: int = 4):
+        """
+        Initialize the index.
+
+        Args:
+            directory (str): Directory written by export_flat_index
+            quantized (bool): Score candidates on the int8 copy before exact re-scoring
+            oversample (int): Shortlist size, as a multiple of k, for int8 scoring
+        """
+        self.directory = directory
+        self.quantized = quantized
+        self.oversample = oversample
+        with open(os.path.join(directory, "meta.json"), 'r', encoding='utf-8') as f:
+            self.meta: Dict[str, Any] = json.load(f)
+
+        # There is nothing to map for an empty store, and mapping zero bytes can fail.
+        mmap_mode = 'r' if self.meta.get("count") else None
+        self.vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode=mmap_mode)
+        if quantized:
+            self.quantized_vectors = np.load(os.path.join(directory, "vectors_int8.npy"), mmap_mode=mmap_mode)
+            self.scales = np.load(os.path.join(directory, "scales.npy"))
+
+        self.ids: List[str] = []
+        self.documents: List[Document] = []
+        with open(os.path.join(directory, "documents.jsonl"), 'r', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                self.ids.append(record["id"])
+                self.documents.append(Document(id=record["id"], page_content=record["page_content"], metadata=record["metadata"]))
+
+        # Per metadata field: the code of each row's value (-1 where the field is missing) and
+        # the code of each distinct value.
+        self._fields: Dict[str, Tuple[np.ndarray, Dict[Any, int]]] = {}
+        for row, document in enumerate(self.documents):
+            for key, value in document.metadata.items():
+                if key not in self._fields:
+                    self._fields[key] = (np.full(len(self.documents), -1, dtype=np.int32), {})
+                codes, values = self._fields[key]
+                codes[row] = values.setdefault(value, len(values))
+
+    def _field_in(self, key: str, values: Iterable[Any]) -> np.ndarray:
+        """Return which rows have one of `values` in a metadata field; None matches a missing field."""
+        codes, known = self._fields.get(key, (np.full(len(self.documents), -1, dtype=np.int32), {}))
+        wanted = [-1 if value is None else known[value] for value in values if value is None or value in known]
+        return np.isin(codes, wanted)
+
+    def _filter_mask(self, where: Dict[str, Any]) -> np.ndarray:
+        """Evaluate a Chroma `where` filter on every row at once, with the semantics of matches_filter."""
+        mask = np.ones(len(self.documents), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._filter_mask(clause)
+            elif key == "$or":
+                matched = np.zeros(len(self.documents), dtype=bool)
+                for clause in condition:
+                    matched |= self._filter_mask(clause)
+                mask &= matched
+            elif isinstance(condition, dict):
+                for operator, operand in condition.items():
+                    if operator == "$eq":
+                        mask &= self._field_in(key, [operand])
+                    elif operator == "$ne":
+                        mask &= ~self._field_in(key, [operand])
+                    elif operator == "$in":
+                        mask &= self._field_in(key, operand)
+                    elif operator == "$nin":
+                        mask &= ~self._field_in(key, operand)
+                    else:
+                        raise ValueError(f"Unsupported filter operator: {operator}")
+            else:
+                mask &= self._field_in(key, [condition])
+        return mask
+
+    def _filter_rows(self, filter: Dict[str, Any]) -> np.ndarray:
+        return np.flatnonzero(self._filter_mask(filter))
+
+    def search(self, embedding: List[float], k: int, filter: Optional[Dict[str, Any]] = None) -> List[int]:
+        """
+        Return the rows of the `k` stored vectors most similar to an embedding, best first.
+
+        Args:
+            embedding (List[float]): The query embedding
+            k (int): Number of rows to return
+            filter (Optional[Dict[str, Any]]): Chroma-style `where` filter on document metadata
+        """
+        query = np.asarray(embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        count = self.vectors.shape[0]
+        k = min(k, count)
+        if k == 0:
+            return []
+
+        if filter:
+            # Filtered searches only score the matching rows, exactly.
+            candidates = self._filter_rows(filter)
+            k = min(k, len(candidates))
+            if k == 0:
+                return []
+        elif self.quantized and k * self.oversample < count:
+            # Quantize the query too and score in int32, which einsum accumulates without
+            # converting the int8 matrix to floats first.
+            query_scale = np.abs(query).max() / 127.0 or 1.0
+            quantized_query = np.round(query / query_scale).astype(np.int8)
+            approximate = np.einsum('ij,j->i', self.quantized_vectors, quantized_query, dtype=np.int32) * (self.scales * query_scale)
+            candidates = np.argpartition(-approximate, k * self.oversample)[:k * self.oversample]
+            candidates.sort()
+        else:
+            candidates = np.arange(count)
+
+        scores = self.vectors[candidates] @ query
+        best = np.argpartition(-scores, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+        best = best[np.argsort(-scores[best])]
+        return candidates[best].tolist()
+
+    def search_many(self, embeddings: List[List[float]], k: int, filter: Optional[Dict[str, Any]] = None) -> List[List[int]]:
+        """
+        Return the best `k` rows for each of several embeddings.
+
+        Without int8 shortlisting, all embeddings are scored in one matrix product, so the
+        stored vectors are read once per batch rather than once per query.
+        """
+        if self.quantized and not filter:
+            return [self.search(embedding, k) for embedding in embeddings]
+
+        queries = np.asarray(embeddings, dtype=np.float32).reshape(len(embeddings), -1)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+        candidates = self._filter_rows(filter) if filter else np.arange(self.vectors.shape[0])
+        k = min(k, len(candidates))
+        if k == 0:
+            return [[] for _ in embeddings]
+
+        scores = self.vectors[candidates] @ queries.T
+        results = []
+        for column in range(scores.shape[1]):
+            column_scores = scores[:, column]
+            best = np.argpartition(-column_scores, k - 1)[:k] if k < len(candidates) else np.arange(len(candidates))
+            best = best[np.argsort(-column_scores[best])]
+            results.append(candidates[best].tolist())
+        return results
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Return the `k` documents most similar to an embedding, matching Chroma's interface."""
+        return [self.documents[row] for row in self.search(embedding, k, filter)]
+
+    def similarity_search_by_vectors(self, embeddings: List[List[float]], k: int = 4, filter: Optional[Dict[str, Any]] = None) -> List[List[Document]]:
+        """Return the `k` documents most similar to each of several embeddings."""
+        return [[self.documents[row] for row in rows] for rows in self.search_many(embeddings, k, filter)]
+
+
+def load_flat_index(persist_directory: str, quantized: bool = False) -> FlatIndex:
+    """Open the flat index exported from a Chroma store, warning if the store was rebuilt since."""
+    index = FlatIndex(os.path.join(persist_directory, FLAT_INDEX_DIRECTORY), quantized=quantized)
+    if index.meta.get("source_build_id") != read_build_id(persist_directory):
+        print(f"Warning: flat index for {persist_directory} is older than the vector store; re-run the export")
+    return index
+
+
+if __name__ == "__main__":
+    for directory in ("data/vector_store_angelone", "data/vector_store_insurance"):
+        export_flat_index(directory)
@@ -1,26 +1,67 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from dotenv import load_dotenv
 from pydantic import BaseModel
+from typing import AsyncIterator
+from rag.concurrency import llm_semaphore
+from rag.metrics import record_usage
 
 load_dotenv()
 
 class LLM:
     def __init__(self, model: str = "gpt-4.1-mini"):
         self.client = OpenAI()
+        self.async_client = AsyncOpenAI()
         self.model = model
 
-    def generate_response(self, user_message: str) -> str:
+    def _build_input(self, user_message: str) -> list:
+        return [{"role": "user", "content": [{"type": "input_text", "text": user_message}]}]
+
+    def generate_response(self, user_message: str, corpus: str = "") -> str:
         response = self.client.responses.create(
             model=self.model,
-            input=[{"role": "user", "content": [{"type": "input_text", "text": user_message}]}]
+            input=self._build_input(user_message)
         )
+        record_usage(self.model, response.usage, corpus)
         return response.output_text
-    
-    def generate_structured_response(self, user_message: str, schema: BaseModel) -> BaseModel:
+
+    def generate_structured_response(self, user_message: str, schema: BaseModel, corpus: str = "") -> BaseModel:
         response = self.client.responses.parse(
             model=self.model,
-            input=[{"role": "user", "content": [{"type": "input_text", "text": user_message}]}],
+            input=self._build_input(user_message),
             text_format=schema,
         )
+        record_usage(self.model, response.usage, corpus)
+        return response.output_parsed
+
+    async def agenerate_response(self, user_message: str, corpus: str = "") -> str:
+        async with llm_semaphore:
+            response = await self.async_client.responses.create(
+                model=self.model,
+                input=self._build_input(user_message)
+            )
+        record_usage(self.model, response.usage, corpus)
+        return response.output_text
+
+    async def agenerate_structured_response(self, user_message: str, schema: BaseModel, corpus: str = "") -> BaseModel:
+        async with llm_semaphore:
+            response = await self.async_client.responses.parse(
+                model=self.model,
+                input=self._build_input(user_message),
+                text_format=schema,
+            )
+        record_usage(self.model, response.usage, corpus)
+        return response.output_parsed
 
-        return response.output_parsed
\ No newline at end of file
+    async def astream_response(self, user_message: str, corpus: str = "") -> AsyncIterator[str]:
+        """Yield the response text in chunks as the model produces them."""
+        async with llm_semaphore:
+            stream = await self.async_client.responses.create(
+                model=self.model,
+                input=self._build_input(user_message),
+                stream=True,
+            )
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type == "response.completed":
+                    record_usage(self.model, event.response.usage, corpus)
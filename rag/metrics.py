@@ -0,0 +1,106 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label set, as Prometheus expects them."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: a count per bucket (the last one is +Inf), the sum and the count.
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(list(self.buckets) + ["+Inf"], counts):
+                    cumulative += bucket_count
+                    le = 'le="{}"'.format(bound if bound == "+Inf" else _format_value(bound))
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+stage_duration = Histogram(
+    "rag_stage_duration_seconds",
+    "Time spent in each stage of answering a query.",
+    ["stage", "corpus", "model"],
+)
+request_duration = Histogram(
+    "rag_request_duration_seconds",
+    "Time to answer a query end to end.",
+    ["corpus", "answered_by"],
+)
+llm_tokens = Histogram(
+    "rag_llm_tokens",
+    "Tokens per OpenAI response, as reported in the response usage.",
+    ["model", "corpus", "type"],
+    buckets=TOKEN_BUCKETS,
+)
+
+METRICS = [stage_duration, request_duration, llm_tokens]
+
+
+@contextmanager
+def span(stage: str, corpus: str = "", model: str = "") -> Iterator[None]:
+    """Record the time spent in the enclosed block as one observation of a stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_duration.observe(time.perf_counter() - start, stage=stage, corpus=corpus, model=model)
+
+
+def record_usage(model: str, usage: Any, corpus: str = "") -> None:
+    """Record the input and output token counts of an OpenAI response, for the corpus it answered."""
+    if usage is None:
+        return
+    llm_tokens.observe(usage.input_tokens, model=model, corpus=corpus, type="input")
+    llm_tokens.observe(usage.output_tokens, model=model, corpus=corpus, type="output")
+
+
+def render_metrics() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,101 @@
+import json
+import re
+from typing import Dict, Iterable, List, Optional
+
+# Words that point at one insurance chunk type. A type filter is only applied when the query
+# matches exactly one type, so ambiguous wording keeps searching every chunk type.
+TYPE_KEYWORDS = {
+    "important_questions": [
+        "deductible", "deductibles", "out-of-pocket limit", "out of pocket limit", "network", "referral", "specialist",
+    ],
+    "medical_events": [
+        "copay", "copayment", "coinsurance", "visit", "test", "x-ray", "imaging", "drug", "drugs", "prescription",
+        "surgery", "emergency", "urgent care", "ambulance", "hospital", "mental health", "behavioral", "substance",
+        "pregnant", "pregnancy", "delivery", "childbirth", "rehabilitation", "skilled nursing", "hospice",
+        "dental", "eye exam", "glasses",
+    ],
+    "others": [
+        "excluded", "exclusion", "exclusions", "not covered", "isn't covered", "other covered services",
+    ],
+}
+
+# Documents that apply to every plan, like the additional notes, carry no plan or chunk type.
+# Hint filters always let them through, so a plan-specific question can still retrieve them.
+PLAN_INDEPENDENT_FILTER = {"source": "additional notes"}
+
+
+class QueryHintExtractor:
+    """
+    Extract plan and chunk-type hints from an insurance query without calling a model.
+
+    Plans are recognized by the words of their names. A word that belongs to a single plan
+    (e.g. "bronze", "7350") identifies that plan; a word shared by several plans (e.g. "5000")
+    is only used when no identifying word is present, and then selects all plans sharing it.
+    """
+
+    def __init__(self, plan_names: Iterable[str]):
+        """
+        Initialize the extractor.
+
+        Args:
+            plan_names (Iterable[str]): Names of the plans as stored in chunk metadata
+        """
+        self.plan_names = list(plan_names)
+        self._plan_words: Dict[str, set] = {name: set(self._words(name)) for name in self.plan_names}
+        counts: Dict[str, int] = {}
+        for words in self._plan_words.values():
+            for word in words:
+                counts[word] = counts.get(word, 0) + 1
+        self._shared_words = {word for word, count in counts.items() if count > 1}
+
+    @staticmethod
+    def _words(text: str) -> List[str]:
+        # "7,350" and "$5,000" become "7350" and "5000".
+        text = re.sub(r'(?<=\d),(?=\d{3})', '', text.lower())
+        return re.findall(r'[a-z0-9]+', text)
+
+    def extract_plans(self, query: str) -> List[str]:
+        """Return the plans a query refers to, or an empty list if it names none."""
+        words = set(self._words(query))
+        identified = [name for name, plan_words in self._plan_words.items() if words & (plan_words - self._shared_words)]
+        if identified:
+            return identified
+        return [name for name, plan_words in self._plan_words.items() if words & plan_words]
+
+    def extract_type(self, query: str) -> Optional[str]:
+        """Return the chunk type a query asks about, or None if it is unclear."""
+        text = " ".join(self._words(query))
+        matched = [
+            chunk_type for chunk_type, keywords in TYPE_KEYWORDS.items()
+            if any(re.search(rf'\b{re.escape(" ".join(self._words(keyword)))}\b', text) for keyword in keywords)
+        ]
+        return matched[0] if len(matched) == 1 else None
+
+    def build_filter(self, query: str) -> Optional[Dict]:
+        """
+        Build a Chroma `where` filter from the hints in a query.
+
+        Args:
+            query (str): The query text
+
+        Returns:
+            Optional[Dict]: The filter, or None if the query carries no hints. Documents
+            matching PLAN_INDEPENDENT_FILTER always pass it.
+        """
+        conditions = []
+        plans = self.extract_plans(query)
+        if plans and len(plans) < len(self.plan_names):
+            conditions.append({"plan": plans[0]} if len(plans) == 1 else {"plan": {"$in": plans}})
+        chunk_type = self.extract_type(query)
+        if chunk_type:
+            conditions.append({"type": chunk_type})
+
+        if not conditions:
+            return None
+        hinted = conditions[0] if len(conditions) == 1 else {"$and": conditions}
+        return {"$or": [hinted, PLAN_INDEPENDENT_FILTER]}
+
+    def build_scope(self, query: str) -> str:
+        """Return the filter of a query as a key, or an empty string if the query carries no hints."""
+        where = self.build_filter(query)
+        return json.dumps(where, sort_keys=True) if where is not None else ""
@@ -2,33 +2,270 @@ from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
 from langchain_chroma import Chroma
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
 from rag.llm import LLM
+from rag.concurrency import embedding_semaphore, vector_search_semaphore
+from rag.embedding_cache import QueryEmbeddingCache, query_embedding_cache
+from rag.answer_cache import create_answer_cache
+from rag.router import create_router
+from rag.flat_index import FlatIndex, load_flat_index, matches_filter
+from rag.faq_index import FAQIndex
+from rag.context import PLAN_DETAILS_HEADER, ContextPacker, format_plan_details, load_plan_details
+from rag.query_hints import PLAN_INDEPENDENT_FILTER, QueryHintExtractor
+from rag.batching import QUERY_BATCH_MAX_SIZE, QUERY_BATCH_WINDOW_MS, MicroBatcher
+from rag.single_flight import single_flight
+from rag.metrics import request_duration, span, stage_duration
+from rag.registry import RAGRegistry
 from pydantic import BaseModel
 
 load_dotenv()
 
+# Fraction of prompts logged at DEBUG level to the "rag.prompts" logger; off by default.
+PROMPT_LOG_SAMPLE_RATE = float(os.getenv("PROMPT_LOG_SAMPLE_RATE", "0"))
+prompt_logger = logging.getLogger("rag.prompts")
+if PROMPT_LOG_SAMPLE_RATE > 0 and not prompt_logger.handlers:
+    prompt_logger.addHandler(logging.StreamHandler())
+    prompt_logger.setLevel(logging.DEBUG)
+
 class RAG:
-    def __init__(self, vector_store_directory: str):
+    def __init__(
+        self,
+        vector_store_directory: str,
+        name: Optional[str] = None,
+        backend: str = "chroma",
+        retriever_k: int = 10,
+        context_token_budget: Optional[int] = None,
+        query_hints: bool = False,
+        min_filtered_hits: int = 3,
+        batch_window_ms: float = QUERY_BATCH_WINDOW_MS,
+        batch_max_size: int = QUERY_BATCH_MAX_SIZE,
+        embedding_cache: QueryEmbeddingCache = query_embedding_cache,
+    ):
         self.vector_store_directory = vector_store_directory
-        self.retriever_k = 10
-        self.embeddings = OpenAIEmbeddings()
-        self.vectorstore = Chroma(
-            persist_directory=self.vector_store_directory,
-            embedding_function=self.embeddings
-        )
+        self.name = name or os.path.basename(vector_store_directory)
+        self.backend = backend
+        self.retriever_k = retriever_k
+        # Queries are far below the model's context length, so they are sent as text rather
+        # than split by tiktoken first, which would need its encoding downloaded.
+        self.embeddings = OpenAIEmbeddings(check_embedding_ctx_length=False)
+        self.embedding_cache = embedding_cache
+        self._vectorstore: Optional[Chroma] = None
+        self._vectorstore_lock = threading.Lock()
+        # "chroma" searches the HNSW index; "flat" and "flat-int8" search the exported flat index.
+        if backend == "chroma":
+            self.retriever = self.vectorstore
+        elif backend in ("flat", "flat-int8"):
+            self.retriever = load_flat_index(self.vector_store_directory, quantized=backend == "flat-int8")
+        else:
+            raise ValueError(f"Unknown retrieval backend: {backend}")
         self.llm = LLM("gpt-4.1-mini")
+        self.context_packer = ContextPacker(self.llm.model, token_budget=context_token_budget)
+        self.plan_details = load_plan_details(self.vector_store_directory)
+        # Plan and chunk-type hints in a query narrow the search with a metadata filter. They
+        # also scope cached answers, so that scoping holds even when filtering is turned off.
+        self._query_hints = QueryHintExtractor(self.plan_details) if self.plan_details else None
+        self.hint_extractor = self._query_hints if query_hints else None
+        self.min_filtered_hits = min_filtered_hits
+        self._filter_lock = threading.Lock()
+        self.filtered_searches = 0
+        self.filter_fallbacks = 0
+        # Concurrent async queries are embedded with one call and searched with one query per batch.
+        self.embedding_batcher = MicroBatcher(self._aembed_batch, batch_window_ms / 1000, batch_max_size)
+        self.search_batcher = MicroBatcher(self._asearch_batch, batch_window_ms / 1000, batch_max_size)
+
+    @property
+    def vectorstore(self) -> Chroma:
+        """The Chroma store, opened on first use; the flat backends only need it for evaluation."""
+        if self._vectorstore is None:
+            with self._vectorstore_lock:
+                if self._vectorstore is None:
+                    self._vectorstore = Chroma(
+                        persist_directory=self.vector_store_directory,
+                        embedding_function=self.embeddings
+                    )
+        return self._vectorstore
+
+    def stored_vectors(self) -> Any:
+        """Return the embeddings of every stored document, one per row."""
+        if isinstance(self.retriever, FlatIndex):
+            return self.retriever.vectors
+        return self.vectorstore.get(include=["embeddings"])["embeddings"]
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query, reusing the cached embedding when the query has been seen before."""
+        embedding = self.embedding_cache.get(self.embeddings.model, query)
+        if embedding is None:
+            # Every corpus embeds queries with the same model, so embedding spans carry no corpus.
+            with span("embedding", model=self.embeddings.model):
+                embedding = self.embeddings.embed_query(query)
+            self.embedding_cache.put(self.embeddings.model, query, embedding)
+        return embedding
+
+    async def aembed_query(self, query: str) -> List[float]:
+        """Embed a query, reusing the cached embedding when the query has been seen before."""
+        embedding = await self.embedding_cache.aget(self.embeddings.model, query)
+        if embedding is None:
+            with span("embedding", model=self.embeddings.model):
+                embedding = await self.embedding_batcher.submit(query)
+            await self.embedding_cache.aput(self.embeddings.model, query, embedding)
+        return embedding
+
+    async def _aembed_batch(self, queries: List[str]) -> List[List[float]]:
+        """Embed a batch of queries with one embedding call."""
+        texts = list(dict.fromkeys(queries))
+        async with embedding_semaphore:
+            embeddings = await self.embeddings.aembed_documents(texts)
+        by_text = dict(zip(texts, embeddings))
+        return [by_text[query] for query in queries]
+
+    def _similarity_search_many(self, embeddings: List[List[float]], where: Optional[Dict] = None) -> List[List[Document]]:
+        """Search several embeddings at once with the same metadata filter."""
+        if isinstance(self.retriever, FlatIndex):
+            return self.retriever.similarity_search_by_vectors(embeddings, k=self.retriever_k, filter=where)
+        # One Chroma collection query searches every embedding in the batch.
+        results = self.vectorstore._collection.query(
+            query_embeddings=embeddings,
+            n_results=self.retriever_k,
+            where=where,
+            include=["documents", "metadatas"],
+        )
+        return [
+            [Document(id=doc_id, page_content=content, metadata=metadata or {}) for doc_id, content, metadata in zip(ids, contents, metadatas)]
+            for ids, contents, metadatas in zip(results["ids"], results["documents"], results["metadatas"])
+        ]
+
+    def search_by_vectors(self, embeddings: List[List[float]], queries: List[Optional[str]]) -> List[List[Document]]:
+        """
+        Retrieve relevant documents for several already embedded queries.
+
+        When a query names a plan or chunk type, only matching documents and plan-independent
+        ones (the additional notes) are searched. If fewer than `min_filtered_hits` matching
+        documents are found, the search is repeated without the filter.
+        Queries sharing a filter are searched together.
+        """
+        groups: Dict[Optional[str], List[int]] = {}
+        filters: Dict[Optional[str], Optional[Dict]] = {None: None}
+        for i, query in enumerate(queries):
+            where = self.hint_extractor.build_filter(query) if self.hint_extractor and query else None
+            key = json.dumps(where, sort_keys=True) if where is not None else None
+            filters[key] = where
+            groups.setdefault(key, []).append(i)
+
+        results: List[List[Document]] = [[] for _ in queries]
+        unfiltered = groups.pop(None, [])
+        for key, rows in groups.items():
+            found = self._similarity_search_many([embeddings[i] for i in rows], filters[key])
+            fallbacks = 0
+            for i, documents in zip(rows, found):
+                # Plan-independent documents always pass the filter, so they do not count as hits.
+                hits = sum(not matches_filter(document.metadata, PLAN_INDEPENDENT_FILTER) for document in documents)
+                if hits >= self.min_filtered_hits:
+                    results[i] = documents
+                else:
+                    unfiltered.append(i)
+                    fallbacks += 1
+            with self._filter_lock:
+                self.filtered_searches += len(rows)
+                self.filter_fallbacks += fallbacks
+
+        if unfiltered:
+            for i, documents in zip(unfiltered, self._similarity_search_many([embeddings[i] for i in unfiltered])):
+                results[i] = documents
+        return results
+
+    def answer_scope(self, query: str) -> str:
+        """Return the plans and chunk type a query names, which a cached answer must share."""
+        return self._query_hints.build_scope(query) if self._query_hints else ""
+
+    def search_by_vector(self, embedding: List[float], query: Optional[str] = None) -> List[Document]:
+        """Retrieve relevant documents for an already embedded query."""
+        with span("search", corpus=self.name, model=self.backend):
+            return self.search_by_vectors([embedding], [query])[0]
 
     def retrieve_documents(self, query: str) -> List[Document]:
         """Retrieve relevant documents for a given query."""
-        retriever = self.vectorstore.as_retriever(search_kwargs={"k": self.retriever_k})
-        return retriever.invoke(query)
+        embedding = self.embed_query(query)
+        return self.search_by_vector(embedding, query)
+
+    async def aretrieve_documents(self, query: str) -> List[Document]:
+        """Retrieve relevant documents for a given query without blocking the event loop."""
+        embedding = await self.aembed_query(query)
+        return await self.asearch_by_vector(embedding, query)
+
+    async def asearch_by_vector(self, embedding: List[float], query: Optional[str] = None) -> List[Document]:
+        """Retrieve relevant documents for an already embedded query."""
+        with span("search", corpus=self.name, model=self.backend):
+            return await self.search_batcher.submit((embedding, query))
+
+    async def _asearch_batch(self, items: List[Tuple[List[float], Optional[str]]]) -> List[List[Document]]:
+        """Search a batch of embedded queries."""
+        # Chroma's client is synchronous, so run the search in a worker thread.
+        async with vector_search_semaphore:
+            return await asyncio.to_thread(
+                self.search_by_vectors, [embedding for embedding, _ in items], [query for _, query in items]
+            )
+
+    def filter_stats(self) -> Dict[str, int]:
+        """Return how many searches were narrowed by query hints and how many fell back."""
+        with self._filter_lock:
+            return {"filtered_searches": self.filtered_searches, "fallbacks": self.filter_fallbacks}
+
+    def batch_stats(self) -> Dict[str, Dict]:
+        """Return the batch sizes achieved for query embeddings and vector searches."""
+        return {"embedding": self.embedding_batcher.stats(), "search": self.search_batcher.stats()}
     
     def _generate_user_prompt(self, query: str, documents: List[Document]) -> str:
         """Generate a user prompt for a given query and documents."""
-        context = "\n".join([f"Document {i+1}:\n{doc.page_content}\n" for i, doc in enumerate(documents)])
-        
-        prompt = f"""Please answer the following question based STRICTLY on the provided documents. If the answer cannot be fully derived from the provided documents, respond with 'I don't know'.
+        with span("prompt", corpus=self.name, model=self.llm.model):
+            # Drop duplicate documents and keep the rest, with their plan details, within the
+            # corpus's token budget.
+            documents = self.context_packer.pack(documents, self.plan_details).documents
+            user_prompt = generate_user_prompt(query, documents, self.plan_details)
+        if PROMPT_LOG_SAMPLE_RATE > 0 and random.random() < PROMPT_LOG_SAMPLE_RATE:
+            prompt_logger.debug("Prompt for %s:\n%s", self.name, user_prompt)
+        return user_prompt
+    
+    def generate_answer(self, query: str, documents: List[Document]) -> str:
+        """Generate an answer to a given query using the retrieved documents."""
+        user_prompt = self._generate_user_prompt(query, documents)
+        with span("generation", corpus=self.name, model=self.llm.model):
+            return self.llm.generate_response(user_prompt, corpus=self.name)
+
+    async def agenerate_answer(self, query: str, documents: List[Document]) -> str:
+        """Generate an answer to a given query using the retrieved documents."""
+        user_prompt = self._generate_user_prompt(query, documents)
+        with span("generation", corpus=self.name, model=self.llm.model):
+            return await self.llm.agenerate_response(user_prompt, corpus=self.name)
+
+    async def astream_answer(self, query: str, documents: List[Document]) -> AsyncIterator[str]:
+        """Stream an answer to a given query using the retrieved documents."""
+        user_prompt = self._generate_user_prompt(query, documents)
+        # Time to first token and time to the full answer are recorded separately.
+        start = time.perf_counter()
+        first_token = True
+        with span("generation", corpus=self.name, model=self.llm.model):
+            async for chunk in self.llm.astream_response(user_prompt, corpus=self.name):
+                if first_token:
+                    first_token = False
+                    stage_duration.observe(time.perf_counter() - start, stage="first_token", corpus=self.name, model=self.llm.model)
+                yield chunk
+    
+def generate_user_prompt(query: str, documents: List[Document], plan_details: Optional[Dict] = None) -> str:
+    """Generate a user prompt for a given query and documents."""
+    context = "\n".join([f"Document {i+1}:\n{doc.page_content}\n" for i, doc in enumerate(documents)])
+    # Insurance chunks reference their plan; its details are included once per distinct plan.
+    plans = format_plan_details(documents, plan_details or {})
+    if plans:
+        context = f"{PLAN_DETAILS_HEADER}{plans}\n\n{context}"
+    
+    prompt = f"""Please answer the following question based STRICTLY on the provided documents. If the answer cannot be fully derived from the provided documents, respond with 'I don't know'.
 
 Context Documents:
 {context}
@@ -43,29 +280,128 @@ Remember:
 5. If there are steps to be followed, state them in a list.
 """
 
-        return prompt
-    
-    def generate_answer(self, query: str, documents: List[Document]) -> str:
-        """Generate an answer to a given query using the retrieved documents."""
-        user_prompt = self._generate_user_prompt(query, documents)
-        print(user_prompt)
-        return self.llm.generate_response(user_prompt)
-    
+    return prompt
+
+# Retrieval backend for every corpus: "chroma", "flat" or "flat-int8" (see rag/flat_index.py).
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma")
+
+# Documents retrieved per query and tokens of document text allowed in the prompt, per corpus.
+# Insurance queries naming a plan or chunk type are searched with a metadata filter first.
+CORPORA = {
+    "angelone": {
+        "name": "angelone",
+        "vector_store_directory": "data/vector_store_angelone",
+        "backend": RETRIEVAL_BACKEND,
+        "retriever_k": int(os.getenv("ANGELONE_RETRIEVER_K", "10")),
+        "context_token_budget": int(os.getenv("ANGELONE_CONTEXT_TOKEN_BUDGET", "2000")),
+    },
+    "insurance": {
+        "name": "insurance",
+        "vector_store_directory": "data/vector_store_insurance",
+        "backend": RETRIEVAL_BACKEND,
+        "retriever_k": int(os.getenv("INSURANCE_RETRIEVER_K", "10")),
+        "context_token_budget": int(os.getenv("INSURANCE_CONTEXT_TOKEN_BUDGET", "2500")),
+        "query_hints": os.getenv("INSURANCE_QUERY_HINTS", "true").lower() == "true",
+        "min_filtered_hits": int(os.getenv("INSURANCE_MIN_FILTERED_HITS", "3")),
+    },
+}
+
+# Shared, lazily built RAG engines. main.py warms these at startup.
+registry = RAGRegistry(CORPORA, RAG)
+
+# Answers reused across similar queries; invalidated when a corpus's vector store is rebuilt.
+answer_cache = create_answer_cache({name: config["vector_store_directory"] for name, config in CORPORA.items()})
+
+# Routes queries locally from their embeddings; built from the stored vectors during warm-up.
+router = create_router()
+
+# Answers near-verbatim AngelOne FAQ questions with the stored answer, without the LLM.
+faq_index = FAQIndex(
+    CORPORA["angelone"]["vector_store_directory"],
+    "angelone",
+    threshold=float(os.getenv("FAQ_FAST_PATH_THRESHOLD", "0.97")),
+)
+
+class Answer(BaseModel):
+    answer: str
+    corpus: str
+    answered_by: str
+    sources: List[str] = []
+
+_router_llm = None
+_router_llm_lock = threading.Lock()
+
+def getRouterLLM() -> LLM:
+    """Return the shared LLM used to classify queries between the corpora."""
+    global _router_llm
+    if _router_llm is None:
+        with _router_llm_lock:
+            if _router_llm is None:
+                _router_llm = LLM("gpt-4.1-nano")
+    return _router_llm
+
+# Progress of warmUp, reported by /ready and /stats. "error" is set by whoever runs warmUp.
+warm_up_status: Dict[str, Any] = {"faq_index": False, "router": False, "error": None}
+
+def warmUp() -> None:
+    """Load every corpus's RAG engine and the router LLM ahead of the first request."""
+    getRouterLLM()
+    registry.load_all()
+    faq_index.load()
+    warm_up_status["faq_index"] = True
+    router.load_vectors({name: engine.stored_vectors() for name, engine in registry.engines.items()})
+    warm_up_status["router"] = True
+
+def readiness() -> Dict[str, Any]:
+    """
+    Return the registry's status, ready only once the engines, the FAQ index and the router
+    have all been loaded and warm-up has not failed.
+
+    A missing FAQ index or an empty store leaves that component disabled rather than pending,
+    so readiness tracks whether its warm-up step ran, not whether it found data.
+    """
+    status = registry.status()
+    status["faq_index_loaded"] = warm_up_status["faq_index"]
+    status["router_built"] = warm_up_status["router"]
+    status["warm_up_error"] = warm_up_status["error"]
+    status["ready"] = bool(
+        status["ready"] and warm_up_status["faq_index"] and warm_up_status["router"] and warm_up_status["error"] is None
+    )
+    return status
+
 def queryAngelOne(query: str) -> str:
-    rag = RAG("data/vector_store_angelone")
+    rag = registry.get("angelone")
     documents = rag.retrieve_documents(query)
     answer = rag.generate_answer(query, documents)
     return answer
 
 def queryInsurance(query: str) -> str:
-    rag = RAG("data/vector_store_insurance")
+    rag = registry.get("insurance")
     documents = rag.retrieve_documents(query)
     answer = rag.generate_answer(query, documents)
     return answer
 
-def getAnswer(query: str) -> str:
-    llm = LLM("gpt-4.1-nano")
-    prompt = f"""
+async def getEngineAsync(name: str) -> RAG:
+    """Return a corpus's RAG engine, building a cold one off the event loop."""
+    if name not in registry.engines:
+        await asyncio.to_thread(registry.load, name)
+    return registry.get(name)
+
+def embedQuery(query: str) -> List[float]:
+    """Embed a query once for routing, caching and retrieval; every corpus uses the same model."""
+    return registry.get(next(iter(CORPORA))).embed_query(query)
+
+async def embedQueryAsync(query: str) -> List[float]:
+    """Embed a query once for routing, caching and retrieval; every corpus uses the same model."""
+    rag = await getEngineAsync(next(iter(CORPORA)))
+    return await rag.aembed_query(query)
+
+class RoutingDecision(BaseModel):
+    isAngelOne: bool
+
+def _generate_routing_prompt(query: str) -> str:
+    """Generate the prompt used to classify a query between the corpora."""
+    return f"""
     You are tasked with determining the category of a given query. The query will either be related to AngelOne, a stock buy and sell platform similar to Robinhood or Zerodha, or it will be related to America's choice insurance plans.
 
     Query: {query}
@@ -77,14 +413,196 @@ def getAnswer(query: str) -> str:
     4. Return True in the field 'isAngelOne' if the query is related to AngelOne, otherwise return False.
     """
 
-    class OutputSchema(BaseModel):
-        isAngelOne: bool
+def routeQuery(query: str, embedding: List[float]) -> str:
+    """Return the name of the corpus a query should be answered from."""
+    name = _routeLocally(embedding)
+    if name is not None:
+        return name
+    llm = getRouterLLM()
+    with span("routing", model=llm.model):
+        isAngelOne = llm.generate_structured_response(_generate_routing_prompt(query), RoutingDecision)
+    return "angelone" if isAngelOne.isAngelOne else "insurance"
+
+def _routeLocally(embedding: List[float]) -> Optional[str]:
+    """Return the corpus picked by the local router, or None if it is not built or is unsure."""
+    if not router.is_built:
+        return None
+    with span("routing", model="local"):
+        return router.route(embedding)
+
+async def _classifyAsync(query: str) -> str:
+    """Return the corpus picked by the LLM classifier."""
+    llm = getRouterLLM()
+    with span("routing", model=llm.model):
+        isAngelOne = await llm.agenerate_structured_response(_generate_routing_prompt(query), RoutingDecision)
+    return "angelone" if isAngelOne.isAngelOne else "insurance"
+
+async def routeQueryAsync(query: str, embedding: List[float]) -> str:
+    """Return the name of the corpus a query should be answered from."""
+    # The local router decides most queries; ambiguous ones fall back to the LLM classifier.
+    name = _routeLocally(embedding)
+    return name if name is not None else await _classifyAsync(query)
+
+# "off": route, then search the chosen corpus.
+# "ambiguous": when the local router is unsure, search every corpus while the LLM classifies.
+# "always": search every corpus while routing, whichever router decides.
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "ambiguous")
+
+async def _routeAsync(query: str, embedding: List[float]) -> Tuple[str, Optional[asyncio.Task]]:
+    """
+    Route a query, returning the chosen corpus and, when retrieval was speculative, the
+    already running search of that corpus.
+    """
+    name = None if SPECULATIVE_RETRIEVAL == "always" else _routeLocally(embedding)
+    if name is None and SPECULATIVE_RETRIEVAL != "off":
+        # Every corpus uses the same embedding model, so one query embedding serves all searches.
+        engines = {corpus: await getEngineAsync(corpus) for corpus in CORPORA}
+        searches = {corpus: asyncio.create_task(engine.asearch_by_vector(embedding, query)) for corpus, engine in engines.items()}
+        try:
+            if SPECULATIVE_RETRIEVAL == "always":
+                name = await routeQueryAsync(query, embedding)
+            else:
+                name = await _classifyAsync(query)
+        except BaseException:
+            for task in searches.values():
+                task.cancel()
+            raise
+        for corpus, task in searches.items():
+            if corpus != name:
+                _discard(task)
+        return name, searches[name]
+
+    if name is None:
+        name = await _classifyAsync(query)
+    return name, None
+
+def _discard(task: asyncio.Task) -> None:
+    """Cancel a search whose result is not needed; retrieve its exception, if any, so it is not logged."""
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+async def _searchAsync(name: str, query: str, embedding: List[float], search: Optional[asyncio.Task]) -> List[Document]:
+    """Return the documents for a routed query, from its speculative search if one is running."""
+    if search is not None:
+        return await search
+    rag = await getEngineAsync(name)
+    return await rag.asearch_by_vector(embedding, query)
+
+async def retrieveAsync(query: str, embedding: List[float]) -> Tuple[str, List[Document]]:
+    """Route a query and retrieve the documents for it from the chosen corpus."""
+    name, search = await _routeAsync(query, embedding)
+    return name, await _searchAsync(name, query, embedding, search)
+
+def _lookupCachedAnswer(name: str, scope: str, query: str, embedding: List[float]) -> Optional[Answer]:
+    """Return the answer from the answer cache or the FAQ fast path, if either has one."""
+    with span("answer_cache"):
+        cached = answer_cache.lookup(name, embedding, scope)
+    if cached is not None:
+        return Answer(answer=cached["answer"], corpus=cached["corpus"], answered_by="answer_cache", sources=cached["sources"])
+    if name != faq_index.corpus:
+        return None
+    with span("faq_lookup", corpus=name):
+        faq = faq_index.lookup(query, embedding)
+    if faq is not None:
+        return Answer(answer=faq["answer"], corpus=name, answered_by="faq_fast_path", sources=faq["urls"])
+    return None
+
+def getAnswer(query: str) -> str:
+    start = time.perf_counter()
+    # Concurrent identical questions share one computation.
+    result = single_flight.call(("answer", QueryEmbeddingCache.normalize(query)), lambda: _getAnswer(query))
+    request_duration.observe(time.perf_counter() - start, corpus=result.corpus, answered_by=result.answered_by)
+    return result.answer
+
+def _getAnswer(query: str) -> Answer:
+    embedding = embedQuery(query)
+    name = routeQuery(query, embedding)
+    rag = registry.get(name)
+    scope = rag.answer_scope(query)
+    cached = _lookupCachedAnswer(name, scope, query, embedding)
+    if cached is not None:
+        return cached
+
+    documents = rag.search_by_vector(embedding, query)
+    answer = rag.generate_answer(query, documents)
+    sources = _get_sources(documents)
+    answer_cache.put(name, query, embedding, answer, sources, scope)
+    return Answer(answer=answer, corpus=name, answered_by="llm", sources=sources)
+
+async def answerQueryAsync(query: str) -> Answer:
+    """Answer a query, reusing the cached answer of a sufficiently similar earlier query."""
+    start = time.perf_counter()
+    # Concurrent identical questions share one computation.
+    result = await single_flight.do(("answer", QueryEmbeddingCache.normalize(query)), lambda: _answerQueryAsync(query))
+    request_duration.observe(time.perf_counter() - start, corpus=result.corpus, answered_by=result.answered_by)
+    return result
+
+async def _answerQueryAsync(query: str) -> Answer:
+    embedding = await embedQueryAsync(query)
+    name, search = await _routeAsync(query, embedding)
+    rag = await getEngineAsync(name)
+    scope = rag.answer_scope(query)
+    cached = _lookupCachedAnswer(name, scope, query, embedding)
+    if cached is not None:
+        if search is not None:
+            _discard(search)
+        return cached
+
+    documents = await _searchAsync(name, query, embedding, search)
+    answer = await rag.agenerate_answer(query, documents)
+    sources = _get_sources(documents)
+    answer_cache.put(name, query, embedding, answer, sources, scope)
+    return Answer(answer=answer, corpus=name, answered_by="llm", sources=sources)
+
+async def getAnswerAsync(query: str) -> str:
+    return (await answerQueryAsync(query)).answer
+
+def _get_sources(documents: List[Document]) -> List[str]:
+    """Return the distinct sources of the documents, in retrieval order."""
+    sources = []
+    for doc in documents:
+        # A deduplicated FAQ document lists every page it appears on.
+        for source in (doc.metadata.get("sources") or doc.metadata.get("source") or "").split("\n"):
+            if source and source not in sources:
+                sources.append(source)
+    return sources
+
+async def streamAnswerAsync(query: str) -> AsyncIterator[Dict]:
+    """
+    Answer a query as a stream of events.
+
+    Routing and retrieval complete first. Then one {"type": "token"} event is yielded per
+    chunk of model output, followed by a final {"type": "sources"} event. An answer served
+    from the answer cache or the FAQ fast path is sent as a single token event. Concurrent
+    identical questions share one stream, and later subscribers receive it from the start.
+    """
+    start = time.perf_counter()
+    async for event in single_flight.stream(("stream", QueryEmbeddingCache.normalize(query)), lambda: _streamAnswerAsync(query)):
+        if event["type"] == "sources":
+            request_duration.observe(time.perf_counter() - start, corpus=event["corpus"], answered_by=event["answered_by"])
+        yield event
+
+async def _streamAnswerAsync(query: str) -> AsyncIterator[Dict]:
+    embedding = await embedQueryAsync(query)
+    name, search = await _routeAsync(query, embedding)
+    rag = await getEngineAsync(name)
+    scope = rag.answer_scope(query)
+    cached = _lookupCachedAnswer(name, scope, query, embedding)
+    if cached is not None:
+        if search is not None:
+            _discard(search)
+        yield {"type": "token", "text": cached.answer}
+        yield {"type": "sources", "corpus": cached.corpus, "answered_by": cached.answered_by, "sources": cached.sources}
+        return
+
+    documents = await _searchAsync(name, query, embedding, search)
+    chunks = []
+    async for chunk in rag.astream_answer(query, documents):
+        chunks.append(chunk)
+        yield {"type": "token", "text": chunk}
+    sources = _get_sources(documents)
+    answer_cache.put(name, query, embedding, "".join(chunks), sources, scope)
+    yield {"type": "sources", "corpus": name, "answered_by": "llm", "sources": sources}
 
-    isAngelOne = llm.generate_structured_response(prompt, OutputSchema)
-    if isAngelOne.isAngelOne:
-        return queryAngelOne(query)
-    else:
-        return queryInsurance(query)
-    
 if __name__ == "__main__":
     print(queryAngelOne("How can I withdraw my money?"))
\ No newline at end of file
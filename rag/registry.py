@@ -0,0 +1,79 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+class RAGRegistry:
+    """
+    A process-wide registry that builds each corpus's RAG engine once and shares it.
+
+    Engines are created by calling `factory(**config)` for each corpus. Building an engine
+    opens the Chroma client, loads the HNSW segment and creates the OpenAI clients, so this
+    should happen once at startup rather than on every request. The engines themselves are
+    read-only after construction, so a single instance can be used from many threads.
+    """
+
+    def __init__(self, corpora: Dict[str, Dict[str, Any]], factory: Callable[..., Any]):
+        """
+        Initialize the registry.
+
+        Args:
+            corpora (Dict[str, Dict[str, Any]]): Mapping of corpus name to factory keyword arguments
+            factory (Callable[..., Any]): Callable used to build an engine for a corpus
+        """
+        self.corpora = corpora
+        self.factory = factory
+        self.engines: Dict[str, Any] = {}
+        self.load_times: Dict[str, float] = {}
+        self._locks = {name: threading.Lock() for name in corpora}
+
+    def load(self, name: str) -> Any:
+        """
+        Build the engine for a corpus if it has not been built yet.
+
+        Args:
+            name (str): Name of the corpus to load
+
+        Returns:
+            Any: The engine for the corpus
+        """
+        engine = self.engines.get(name)
+        if engine is not None:
+            return engine
+
+        if name not in self.corpora:
+            raise KeyError(f"Unknown corpus: {name}")
+
+        # Only one thread builds a given corpus; the others wait and reuse its engine.
+        with self._locks[name]:
+            engine = self.engines.get(name)
+            if engine is None:
+                start = time.perf_counter()
+                engine = self.factory(**self.corpora[name])
+                self.load_times[name] = time.perf_counter() - start
+                self.engines[name] = engine
+                print(f"Loaded {name} RAG engine in {self.load_times[name]:.2f}s")
+        return engine
+
+    def load_all(self) -> None:
+        """Build the engines for every configured corpus."""
+        for name in self.corpora:
+            self.load(name)
+
+    def get(self, name: str) -> Any:
+        """Return the engine for a corpus, building it on first use."""
+        return self.load(name)
+
+    def is_ready(self) -> bool:
+        """Return True once every configured corpus has been loaded."""
+        return all(name in self.engines for name in self.corpora)
+
+    def status(self) -> Dict[str, Any]:
+        """Return readiness and load time information for every corpus."""
+        loaded: List[str] = [name for name in self.corpora if name in self.engines]
+        return {
+            "ready": self.is_ready(),
+            "loaded": loaded,
+            "pending": [name for name in self.corpora if name not in self.engines],
+            "load_times_seconds": {name: round(self.load_times[name], 3) for name in loaded},
+        }
@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class EmbeddingRouter:
+    """
+    Route a query to a corpus by comparing its embedding with the vectors already stored in each corpus.
+
+    With method "knn" a corpus is scored by the mean cosine similarity of the query to its
+    `top_k` nearest stored vectors. With method "centroid" it is scored by the similarity to
+    the mean of its vectors. The best corpus is returned only when it beats the runner-up by
+    at least `margin`; otherwise the decision is ambiguous and the caller should fall back
+    to the LLM classifier.
+    """
+
+    def __init__(self, method: str = "knn", top_k: int = 5, margin: float = 0.03):
+        """
+        Initialize the router.
+
+        Args:
+            method (str): Scoring method, either "knn" or "centroid"
+            top_k (int): Number of nearest vectors averaged per corpus with method "knn"
+            margin (float): Minimum score difference between the two best corpora
+        """
+        if method not in ("knn", "centroid"):
+            raise ValueError(f"Unknown routing method: {method}")
+        self.method = method
+        self.top_k = top_k
+        self.margin = margin
+        self._matrices: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+        self.decisions = 0
+        self.fallbacks = 0
+        self.total_decision_seconds = 0.0
+        self.max_decision_seconds = 0.0
+
+    @property
+    def is_built(self) -> bool:
+        return bool(self._matrices)
+
+    def build(self, vectorstores: Dict[str, Any]) -> None:
+        """
+        Load the per-corpus representations from the vectors stored in Chroma.
+
+        Args:
+            vectorstores (Dict[str, Any]): Mapping of corpus name to its Chroma vector store
+        """
+        self.load_vectors({name: vectorstore.get(include=["embeddings"])["embeddings"] for name, vectorstore in vectorstores.items()})
+
+    def load_vectors(self, vectors: Dict[str, Any]) -> None:
+        """
+        Load the per-corpus representations from each corpus's document vectors.
+
+        Args:
+            vectors (Dict[str, Any]): Mapping of corpus name to its document vectors, one per row
+        """
+        matrices = {}
+        for name, embeddings in vectors.items():
+            if embeddings is None or len(embeddings) == 0:
+                # Without vectors for every corpus the scores are meaningless; keep using the LLM.
+                print(f"Router disabled: no vectors found for {name}")
+                return
+            matrix = self._normalize_rows(np.asarray(embeddings, dtype=np.float32))
+            if self.method == "centroid":
+                matrix = self._normalize_rows(matrix.mean(axis=0, keepdims=True))
+            matrices[name] = matrix
+            print(f"Router loaded {len(embeddings)} vectors for {name}")
+        self._matrices = matrices
+
+    def score(self, embedding: List[float]) -> Dict[str, float]:
+        """Return the similarity score of a query embedding for every corpus."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        scores = {}
+        for name, matrix in self._matrices.items():
+            similarities = matrix @ vector
+            k = min(self.top_k, len(similarities))
+            if k < len(similarities):
+                similarities = np.partition(similarities, -k)[-k:]
+            scores[name] = float(similarities.mean())
+        return scores
+
+    def route(self, embedding: List[float]) -> Optional[str]:
+        """
+        Pick the corpus for a query embedding.
+
+        Args:
+            embedding (List[float]): Embedding of the query
+
+        Returns:
+            Optional[str]: The corpus name, or None when the decision is ambiguous
+        """
+        start = time.perf_counter()
+        scores = self.score(embedding)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        decided = len(ranked) == 1 or ranked[0][1] - ranked[1][1] >= self.margin
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.decisions += 1
+            self.total_decision_seconds += elapsed
+            self.max_decision_seconds = max(self.max_decision_seconds, elapsed)
+            if not decided:
+                self.fallbacks += 1
+        return ranked[0][0] if decided else None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how often the router decided locally and how long decisions took."""
+        with self._lock:
+            return {
+                "method": self.method,
+                "margin": self.margin,
+                "decisions": self.decisions,
+                "fallbacks": self.fallbacks,
+                "fallback_rate": round(self.fallbacks / self.decisions, 4) if self.decisions else 0.0,
+                "avg_decision_ms": round(1000 * self.total_decision_seconds / self.decisions, 3) if self.decisions else 0.0,
+                "max_decision_ms": round(1000 * self.max_decision_seconds, 3),
+            }
+
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+def create_router(method: Optional[str] = None) -> EmbeddingRouter:
+    """Create a router configured from ROUTER_* environment variables."""
+    return EmbeddingRouter(
+        method=method or os.getenv("ROUTER_METHOD", "knn"),
+        top_k=int(os.getenv("ROUTER_TOP_K", "5")),
+        margin=float(os.getenv("ROUTER_MARGIN", "0.03")),
+    )
+
+
+def _load_labeled_questions(faq_pairs_path: str, plans_path: str) -> List[Dict[str, str]]:
+    """
+    Build labeled routing examples from the FAQ questions, the plans' important questions and
+    one cost question per plan and medical-event service.
+
+    The cost questions are phrased for the evaluation, so no stored document contains them.
+    """
+    examples = []
+    with open(faq_pairs_path, 'r', encoding='utf-8') as f:
+        for entry in json.load(f):
+            for faq in entry['faq_pairs']:
+                examples.append({"query": faq['question'], "corpus": "angelone"})
+    with open(plans_path, 'r', encoding='utf-8') as f:
+        for plan in json.load(f):
+            plan_name = plan["plan details"]["plan name"]
+            for question_data in plan["important questions"]:
+                examples.append({"query": question_data["question"], "corpus": "insurance"})
+            for event in plan["common medical events"]:
+                for service in event["services"]:
+                    query = f"How much does {service['service name'].lower()} cost with the {plan_name} plan?"
+                    examples.append({"query": query, "corpus": "insurance"})
+    return examples
+
+
+def _split_examples(examples: List[Dict[str, str]], holdout: float, seed: int) -> List[Dict[str, str]]:
+    """Return a seeded random `holdout` fraction of each corpus's distinct questions."""
+    from data_processing.dedup_faq_pairs import normalize_text
+
+    # The same question appears on many pages and in every plan; each is held out as a whole.
+    distinct = list({normalize_text(example["query"]): example for example in examples}.values())
+    rng = random.Random(seed)
+    held_out = []
+    for corpus in sorted({example["corpus"] for example in distinct}):
+        questions = [example for example in distinct if example["corpus"] == corpus]
+        rng.shuffle(questions)
+        held_out.extend(questions[:max(1, round(holdout * len(questions)))])
+    return held_out
+
+
+def _training_vectors(vectorstores: Dict[str, Any], held_out: List[Dict[str, str]]) -> Dict[str, np.ndarray]:
+    """Return each corpus's stored vectors, without the documents any held-out question was taken from."""
+    from data_processing.dedup_faq_pairs import normalize_text
+
+    questions = [normalize_text(example["query"]) for example in held_out]
+    vectors = {}
+    for name, vectorstore in vectorstores.items():
+        data = vectorstore.get(include=["embeddings", "documents"])
+        keep = [
+            row for row, document in enumerate(data["documents"])
+            if not any(question in normalize_text(document) for question in questions)
+        ]
+        print(f"Router evaluation: {len(data['documents']) - len(keep)} of {len(data['documents'])} {name} documents held out")
+        vectors[name] = np.asarray(data["embeddings"], dtype=np.float32)[keep]
+    return vectors
+
+
+def evaluate_router(
+    faq_pairs_path: str = "data/angelone_faq_pairs.json",
+    plans_path: str = "data/plans_final.json",
+    holdout: float = 0.2,
+    seed: int = 0,
+) -> None:
+    """
+    Measure routing accuracy offline on questions taken from the source data.
+
+    The stored documents contain the questions themselves, so routing them with the full
+    stores would score each question against its own document. Instead a `holdout` fraction of
+    each corpus's distinct questions is set aside, the router is built without the documents they come
+    from, and only the held-out questions are routed.
+
+    Reports the accuracy of local decisions, how often the router would fall back to the
+    LLM, and the accuracy the router would have if it always trusted its best score.
+    """
+    from rag.rag import embedQuery, registry
+
+    registry.load_all()
+    vectorstores = {name: engine.vectorstore for name, engine in registry.engines.items()}
+    examples = _split_examples(_load_labeled_questions(faq_pairs_path, plans_path), holdout, seed)
+    training_vectors = _training_vectors(vectorstores, examples)
+    for method in ("knn", "centroid"):
+        router = create_router(method)
+        router.load_vectors(training_vectors)
+
+        correct_local = 0
+        correct_forced = 0
+        for example in examples:
+            embedding = embedQuery(example["query"])
+            scores = router.score(embedding)
+            best = max(scores, key=scores.get)
+            correct_forced += best == example["corpus"]
+            decision = router.route(embedding)
+            correct_local += decision == example["corpus"]
+
+        stats = router.stats()
+        local = stats["decisions"] - stats["fallbacks"]
+        print(f"Method: {method}")
+        print(f"  Held-out examples: {len(examples)} ({sum(example['corpus'] == 'insurance' for example in examples)} insurance)")
+        print(f"  Local decisions: {local} (fallback rate {stats['fallback_rate']:.2%})")
+        print(f"  Accuracy of local decisions: {correct_local / local if local else 0.0:.2%}")
+        print(f"  Accuracy without fallback: {correct_forced / len(examples):.2%}")
+        print(f"  Avg decision time: {stats['avg_decision_ms']} ms (max {stats['max_decision_ms']} ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure local routing accuracy on held-out source questions.")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of the distinct questions routed and left out of the router")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    evaluate_router(holdout=args.holdout, seed=args.seed)
@@ -0,0 +1,165 @@
+import asyncio
+import copy
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, TypeVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+Result = TypeVar("Result")
+
+
+class _Broadcast:
+    """
+    The events of one in-flight stream, replayed to every subscriber from the start.
+
+    Each subscriber gets its own shallow copy of every event, so one subscriber changing an
+    event does not change what the others receive.
+    """
+
+    def __init__(self):
+        self.events: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = asyncio.Event()
+
+    def publish(self, event: Any) -> None:
+        self.events.append(event)
+        self.changed.set()
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self.changed.set()
+
+    async def subscribe(self) -> AsyncIterator[Any]:
+        position = 0
+        while True:
+            while position < len(self.events):
+                yield copy.copy(self.events[position])
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            self.changed.clear()
+            await self.changed.wait()
+
+
+class SingleFlight:
+    """
+    Share one computation among concurrent callers asking for the same key.
+
+    The first caller for a key (the leader) starts the computation; callers arriving while it
+    is in flight (followers) wait for the leader's result instead of starting their own. Async
+    computations and streams run in their own task, so a leader that disconnects does not
+    cancel the work its followers are waiting on. Nothing is kept once a computation finishes.
+    """
+
+    def __init__(self, enabled: bool = True):
+        """
+        Initialize the coalescer.
+
+        Args:
+            enabled (bool): Coalesce calls; when False every call runs its own computation
+        """
+        self.enabled = enabled
+        self._tasks: Dict[Any, asyncio.Task] = {}
+        self._streams: Dict[Any, _Broadcast] = {}
+        self._pumps: Set[asyncio.Task] = set()
+        self._futures: Dict[Any, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def _count(self, leader: bool) -> None:
+        with self._lock:
+            if leader:
+                self.leaders += 1
+            else:
+                self.followers += 1
+
+    async def do(self, key: Any, compute: Callable[[], Awaitable[Result]]) -> Result:
+        """Return the result of `compute()`, sharing it with concurrent callers of the same key."""
+        if not self.enabled:
+            return await compute()
+        task = self._tasks.get(key)
+        self._count(task is None)
+        if task is None:
+            task = asyncio.get_running_loop().create_task(compute())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._tasks.pop(key, None) if self._tasks.get(key) is t else None)
+        return await asyncio.shield(task)
+
+    async def stream(self, key: Any, produce: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """Yield the events of `produce()`, sharing one stream among concurrent callers of the same key."""
+        if not self.enabled:
+            async for event in produce():
+                yield event
+            return
+        broadcast = self._streams.get(key)
+        self._count(broadcast is None)
+        if broadcast is None:
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            pump = asyncio.get_running_loop().create_task(self._pump(key, broadcast, produce))
+            self._pumps.add(pump)
+            pump.add_done_callback(self._pumps.discard)
+        async for event in broadcast.subscribe():
+            yield event
+
+    async def _pump(self, key: Any, broadcast: _Broadcast, produce: Callable[[], AsyncIterator[Any]]) -> None:
+        try:
+            async for event in produce():
+                broadcast.publish(event)
+        except Exception as e:
+            broadcast.close(e)
+        else:
+            broadcast.close()
+        finally:
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+            if not broadcast.done:
+                broadcast.close(asyncio.CancelledError())
+
+    def call(self, key: Any, compute: Callable[[], Result]) -> Result:
+        """Return the result of `compute()`, sharing it with concurrent threads calling with the same key."""
+        if not self.enabled:
+            return compute()
+        with self._lock:
+            future = self._futures.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._futures[key] = future
+                self.leaders += 1
+            else:
+                self.followers += 1
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(compute())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._futures[key]
+        return future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how many computations were started and how many callers shared one instead."""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "in_flight": len(self._tasks) + len(self._streams) + len(self._futures),
+                "computations": self.leaders,
+                "computations_saved": self.followers,
+            }
+
+
+# Concurrent identical questions share one answer computation unless SINGLE_FLIGHT=false.
+single_flight = SingleFlight(enabled=os.getenv("SINGLE_FLIGHT", "true").lower() == "true")
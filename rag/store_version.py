@@ -0,0 +1,40 @@
+import os
+import time
+import uuid
+from typing import Optional
+
+BUILD_ID_FILE = "build_id"
+
+
+def write_build_id(directory: str) -> str:
+    """
+    Record that the vector store in a directory has been (re)built.
+
+    Args:
+        directory (str): The vector store's persist directory
+
+    Returns:
+        str: The new build id
+    """
+    build_id = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, BUILD_ID_FILE), 'w', encoding='utf-8') as f:
+        f.write(build_id)
+    return build_id
+
+
+def read_build_id(directory: str) -> Optional[str]:
+    """
+    Read the id of the last build of the vector store in a directory.
+
+    Args:
+        directory (str): The vector store's persist directory
+
+    Returns:
+        Optional[str]: The build id, or None if the store predates build ids
+    """
+    try:
+        with open(os.path.join(directory, BUILD_ID_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
@@ -2,35 +2,64 @@ from dotenv import load_dotenv
 from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from openai import APIConnectionError, APITimeoutError, RateLimitError
+from typing import Any, Dict, List
+from rag.embedding_store import EmbeddingStore, StoreBackedEmbeddings
+from rag.faq_index import FAQ_INDEX_FILE, build_faq_index
+from rag.context import PLAN_DETAILS_FILE
+from rag.store_version import write_build_id
+from data_processing.dedup_faq_pairs import dedup_faq_pairs
 
+import argparse
+import hashlib
 import json
+import os
+import random
+import tiktoken
+import time
 
 load_dotenv()
 
+MANIFEST_FILE = "manifest.json"
+
 class VectorStore:
     def __init__(self):
         self.angelone_vector_store_directory = "data/vector_store_angelone"
         self.insurance_vector_store_directory = "data/vector_store_insurance"
-        self.embeddings = OpenAIEmbeddings()
+        # Every build path reads vectors from the shared embedding store before calling OpenAI.
+        self.embedding_store = EmbeddingStore("data/embedding_store")
+        self.embeddings = StoreBackedEmbeddings(OpenAIEmbeddings(), self.embedding_store)
         self.plans_path = "data/plans_final.json"
         self.additional_notes_path = "data/additional_notes.txt"
         self.angelone_faq_pairs_path = "data/angelone_faq_pairs.json"
+        # Jaccard similarity of question and answer above which FAQ pairs are merged; above 1, only exact duplicates are.
+        self.faq_dedup_threshold = 0.85
+        self.batch_size = 100
+        self.max_workers = 4
+        self.max_retries = 6
 
     def _load_angelone_faq_pairs(self) -> List[Document]:
         """Load angelone faq pairs from json file and convert to documents."""
         with open(self.angelone_faq_pairs_path, 'r', encoding='utf-8') as f:
             faq_data = json.load(f)
         
+        # Pages repeat the same FAQ blocks; each group of duplicates becomes one document
+        # listing every page it appears on, so copies do not crowd each other out of the top k.
+        faq_pairs, report = dedup_faq_pairs(faq_data, self.faq_dedup_threshold)
+        print(f"AngelOne FAQ dedup: {report}")
+
         documents = []
-        for entry in faq_data:
-            url = entry['url']
-            for faq in entry['faq_pairs']:
-                question = faq['question']
-                answer = faq['answer']
-                content = f"Question\n{question}\nAnswer\n{answer}"
-                metadata = {"source": url}
-                documents.append(Document(page_content=content, metadata=metadata))
+        for faq in faq_pairs:
+            url = faq['urls'][0]
+            question = faq['question']
+            answer = faq['answer']
+            content = f"Question\n{question}\nAnswer\n{answer}"
+            metadata = {"source": url}
+            if len(faq['urls']) > 1:
+                # Chroma metadata values are scalars, so all the source URLs are joined by newlines.
+                metadata["sources"] = "\n".join(faq['urls'])
+            documents.append(Document(id=self._stable_id("faq", url, question), page_content=content, metadata=metadata))
         
         # print(documents[0])
         return documents
@@ -43,11 +72,13 @@ class VectorStore:
         documents = []
         # Split the text by double newlines to separate each document
         notes_list = notes_data.split('\n\n')
-        for note in notes_list:
+        for index, note in enumerate(notes_list):
             content = note.strip()
             if content:
                 metadata = {"source": "additional notes"}
-                documents.append(Document(page_content=content, metadata=metadata))
+                # Notes are keyed on their text, not their position, so inserting a paragraph
+                # does not make every later note look changed.
+                documents.append(Document(id=self._stable_id("notes", content), page_content=content, metadata=metadata))
         
         # print(len(documents))
         return documents
@@ -57,54 +88,76 @@ class VectorStore:
         with open(self.plans_path, 'r', encoding='utf-8') as f:
             plans_data = json.load(f)
         
+        # Plan-level details are stored once per plan (see _write_plan_details) and added to the
+        # prompt once per distinct plan, so each chunk only embeds its own text and the plan name.
+        # The plan, chunk type and event category are kept as metadata so retrieval can filter on them.
         documents = []
         for plan in plans_data:
             plan_name = plan["plan details"]["plan name"]
             
             # Process important questions
             for question_data in plan["important questions"]:
-                content = f"""Start of information for Plan: {plan_name}
-                "plan details": {plan["plan details"]["plan details"]}
-                "question": {question_data["question"]}
-                "answer": {question_data["answer"]}
-                "why it matters": {question_data["why it matters"]}
-                End of information for Plan: {plan_name}"""
-                document = Document(page_content=content, metadata={"source": "plans", "type": "important_questions"})
+                content = "\n".join([
+                    f"Plan: {plan_name}",
+                    f"\"question\": {question_data['question']}",
+                    f"\"answer\": {question_data['answer']}",
+                    f"\"why it matters\": {question_data['why it matters']}",
+                ])
+                document = Document(
+                    id=self._stable_id("plans", plan_name, "important_questions", question_data["question"]),
+                    page_content=content,
+                    metadata={"source": "plans", "type": "important_questions", "plan": plan_name},
+                )
                 documents.append(document)
-                # print(document)
-                # break;
             
             # Process common medical events
             for event in plan["common medical events"]:
                 for service in event["services"]:
-                    content = f"""Start of information for Plan: {plan_name}
-                    "plan details": {plan["plan details"]["plan details"]}
-                    "event": {event["event category"]}
-                    "service": {service["service name"]}
-                    "member out of pocket": {service["member out of pocket"]}
-                    "limitations and exceptions": {service["limitations and exceptions"]}
-                    End of information for Plan: {plan_name}"""
-                    document = Document(page_content=content, metadata={"source": "plans", "type": "medical_events"})
+                    content = "\n".join([
+                        f"Plan: {plan_name}",
+                        f"\"event\": {event['event category']}",
+                        f"\"service\": {service['service name']}",
+                        f"\"member out of pocket\": {service['member out of pocket']}",
+                        f"\"limitations and exceptions\": {service['limitations and exceptions']}",
+                    ])
+                    document = Document(
+                        id=self._stable_id("plans", plan_name, "medical_events", event["event category"], service["service name"]),
+                        page_content=content,
+                        metadata={
+                            "source": "plans",
+                            "type": "medical_events",
+                            "plan": plan_name,
+                            "event_category": event["event category"],
+                        },
+                    )
                     documents.append(document)
-                #     print(document)
-                #     break;
-                # break;
             
             # Process excluded and covered services
             excluded_services = ", ".join(plan["excluded services"])
             other_covered = ", ".join(plan["other covered services"])
-            content = f"""Start of information for Plan: {plan_name}
-            "plan details": {plan["plan details"]["plan details"]}
-            The following services are excluded in the plan: {excluded_services}
-            Other covered services available with plan: {other_covered}
-            End of information for Plan: {plan_name}"""
-            document = Document(page_content=content, metadata={"source": "plans", "type": "others"})
+            content = "\n".join([
+                f"Plan: {plan_name}",
+                f"The following services are excluded in the plan: {excluded_services}",
+                f"Other covered services available with plan: {other_covered}",
+            ])
+            document = Document(
+                id=self._stable_id("plans", plan_name, "others"),
+                page_content=content,
+                metadata={"source": "plans", "type": "others", "plan": plan_name},
+            )
             documents.append(document)
-            # print(document)
-            # break;
         
         return documents
 
+    def _write_plan_details(self) -> None:
+        """Store the plan-level details of every plan once, next to the insurance vector store."""
+        with open(self.plans_path, 'r', encoding='utf-8') as f:
+            plans_data = json.load(f)
+        plan_details = {plan["plan details"]["plan name"]: plan["plan details"] for plan in plans_data}
+        os.makedirs(self.insurance_vector_store_directory, exist_ok=True)
+        with open(os.path.join(self.insurance_vector_store_directory, PLAN_DETAILS_FILE), 'w', encoding='utf-8') as f:
+            json.dump(plan_details, f, indent=2, ensure_ascii=False)
+
     def _create_angelone_splits(self) -> List[Document]:
         """Load data from all the sources and convert to documents."""
         return self._load_angelone_faq_pairs()
@@ -115,22 +168,236 @@ class VectorStore:
         documents.extend(self._load_additional_notes())
         return documents
 
+    @staticmethod
+    def _stable_id(*parts: str) -> str:
+        """Return an id that identifies a document by where it comes from rather than by its content."""
+        return hashlib.sha256("\x1f".join(parts).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _document_hash(document: Document) -> str:
+        """Return a hash of a document's content and metadata, as recorded in the manifest."""
+        payload = json.dumps({"content": document.page_content, "metadata": document.metadata}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed a batch of texts, backing off and retrying when rate limited."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.embeddings.embed_documents(texts)
+            except (RateLimitError, APITimeoutError, APIConnectionError) as e:
+                if attempt == self.max_retries:
+                    raise
+                retry_after = getattr(getattr(e, 'response', None), 'headers', {}).get('retry-after')
+                delay = float(retry_after) if retry_after else min(60.0, 2 ** attempt) * (0.5 + random.random())
+                print(f"Embedding batch failed ({type(e).__name__}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _get_collection(self, persist_directory: str):
+        """Return the underlying Chroma collection of a vector store."""
+        return Chroma(persist_directory=persist_directory, embedding_function=self.embeddings)._collection
+
+    def bulk_ingest(self, documents: List[Document], persist_directory: str, ids: List[str]) -> Dict[str, Any]:
+        """
+        Embed documents in parallel batches and write each batch to the collection as it completes.
+
+        Completed batches stay stored if a later one fails, so an interrupted build only has
+        the remaining documents left to embed when it is run again.
+
+        Args:
+            documents (List[Document]): The documents to ingest
+            persist_directory (str): Directory of the Chroma vector store
+            ids (List[str]): Ids to upsert the documents under, replacing stored documents
+
+        Returns:
+            Dict[str, Any]: Counts and throughput of the ingestion
+        """
+        collection = self._get_collection(persist_directory)
+
+        unique_documents = dict(zip(ids, documents))
+        pending = list(ids)
+        print(f"{persist_directory}: {len(pending)} documents to embed")
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        batches = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+        embedded_documents = 0
+        embedded_tokens = 0
+        start_time = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            future_to_batch = {
+                executor.submit(self._embed_batch, [unique_documents[doc_id].page_content for doc_id in batch]): batch
+                for batch in batches
+            }
+            try:
+                for future in as_completed(future_to_batch):
+                    batch = future_to_batch[future]
+                    batch_documents = [unique_documents[doc_id] for doc_id in batch]
+                    # Writes happen on this thread only; completed batches survive a later failure.
+                    collection.upsert(
+                        ids=batch,
+                        embeddings=future.result(),
+                        documents=[doc.page_content for doc in batch_documents],
+                        metadatas=[doc.metadata for doc in batch_documents],
+                    )
+                    embedded_documents += len(batch)
+                    embedded_tokens += sum(len(encoding.encode(doc.page_content)) for doc in batch_documents)
+                    print(f"  Stored {embedded_documents}/{len(pending)} documents")
+            except BaseException:
+                # Stop queued batches; the ones already stored are reused when the build is resumed.
+                for future in future_to_batch:
+                    future.cancel()
+                raise
+
+        elapsed = time.perf_counter() - start_time
+        summary = {
+            "documents": len(ids),
+            "embedded": embedded_documents,
+            "tokens": embedded_tokens,
+            "seconds": round(elapsed, 2),
+            "documents_per_second": round(embedded_documents / elapsed, 2) if elapsed else 0.0,
+            "tokens_per_second": round(embedded_tokens / elapsed, 2) if elapsed else 0.0,
+        }
+        print(f"{persist_directory}: {summary}")
+        return summary
+
+    def _build_faq_index(self) -> None:
+        """Build the FAQ fast-path index next to the AngelOne vector store."""
+        with open(self.angelone_faq_pairs_path, 'r', encoding='utf-8') as f:
+            faq_data = json.load(f)
+        build_faq_index(faq_data, self.embeddings, self.angelone_vector_store_directory)
+
     def create_vector_store(self) -> None:
-        """Create and persist a new vector store from documents."""
-        splits = self._create_angelone_splits()
-        Chroma.from_documents(
-            documents=splits,
-            embedding=self.embeddings,
-            persist_directory=self.angelone_vector_store_directory
-        )
-
-        splits = self._create_insurance_splits()
-        Chroma.from_documents(
-            documents=splits,
-            embedding=self.embeddings,
-            persist_directory=self.insurance_vector_store_directory
-        )
+        """
+        Build both vector stores from the source files.
+
+        Unlike a sync, the build checks every stored document against its source instead of
+        trusting the manifest, so it repairs a store whose manifest is missing or stale, and
+        resumes an interrupted build without re-embedding what was already stored.
+        """
+        self.sync_vector_store(self._create_angelone_splits(), self.angelone_vector_store_directory, full=True)
+        self._build_faq_index()
+        write_build_id(self.angelone_vector_store_directory)
+
+        self.sync_vector_store(self._create_insurance_splits(), self.insurance_vector_store_directory, full=True)
+        self._write_plan_details()
+        write_build_id(self.insurance_vector_store_directory)
+
+    def _read_manifest(self, persist_directory: str) -> Dict[str, str]:
+        """Read the id -> content hash manifest of a vector store."""
+        try:
+            with open(os.path.join(persist_directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)["documents"]
+        except FileNotFoundError:
+            return {}
+
+    def _write_manifest(self, persist_directory: str, manifest: Dict[str, str]) -> None:
+        """Write the id -> content hash manifest of a vector store."""
+        path = os.path.join(persist_directory, MANIFEST_FILE)
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"documents": manifest}, f, indent=2, sort_keys=True)
+        os.replace(path + ".tmp", path)
+
+    def sync_vector_store(self, documents: List[Document], persist_directory: str, full: bool = False) -> Dict[str, int]:
+        """
+        Bring a vector store in line with its source documents, embedding only what changed.
+
+        Each document is identified by its stable id and fingerprinted by a hash of its content
+        and metadata. New and changed documents are embedded and upserted, documents that are
+        no longer produced are deleted, and the manifest of hashes is rewritten.
+
+        Args:
+            documents (List[Document]): The current source documents of the store
+            persist_directory (str): Directory of the Chroma vector store
+            full (bool): Hash the stored documents instead of reading the manifest
+
+        Returns:
+            Dict[str, int]: Number of documents added, updated, deleted and unchanged
+        """
+        desired = {}
+        for document in documents:
+            doc_id = document.id
+            # The same question can appear twice on a page; keep both copies under distinct ids.
+            suffix = 1
+            while doc_id in desired:
+                suffix += 1
+                doc_id = f"{document.id}-{suffix}"
+            desired[doc_id] = document
+
+        collection = self._get_collection(persist_directory)
+        if full:
+            stored = collection.get(include=["documents", "metadatas"])
+            existing = set(stored["ids"])
+            manifest = {
+                doc_id: self._document_hash(Document(page_content=content, metadata=metadata or {}))
+                for doc_id, content, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+            }
+        else:
+            manifest = self._read_manifest(persist_directory)
+            existing = set(collection.get(include=[])["ids"])
+        hashes = {doc_id: self._document_hash(document) for doc_id, document in desired.items()}
+
+        added = [doc_id for doc_id in desired if doc_id not in existing]
+        updated = [doc_id for doc_id in desired if doc_id in existing and manifest.get(doc_id) != hashes[doc_id]]
+        unchanged = len(desired) - len(added) - len(updated)
+        # Anything else in the collection is stale, including documents stored under the
+        # content-derived ids that earlier full builds used.
+        deleted = [doc_id for doc_id in existing if doc_id not in desired]
+
+        changed = added + updated
+        if changed:
+            self.bulk_ingest([desired[doc_id] for doc_id in changed], persist_directory, ids=changed)
+        for start in range(0, len(deleted), 1000):
+            collection.delete(ids=deleted[start:start + 1000])
+        self._write_manifest(persist_directory, hashes)
+        if changed or deleted:
+            write_build_id(persist_directory)
+
+        summary = {"added": len(added), "updated": len(updated), "deleted": len(deleted), "unchanged": unchanged}
+        print(f"{persist_directory}: {summary}")
+        return summary
+
+    def sync(self) -> None:
+        """Incrementally update both vector stores from the current source files."""
+        summary = self.sync_vector_store(self._create_angelone_splits(), self.angelone_vector_store_directory)
+        self._build_faq_index()
+        if summary["added"] or summary["updated"] or summary["deleted"]:
+            # Written again now that the FAQ index is rebuilt too, so servers reload it.
+            write_build_id(self.angelone_vector_store_directory)
+        self.sync_vector_store(self._create_insurance_splits(), self.insurance_vector_store_directory)
+        self._write_plan_details()
+
+    def collect_garbage(self) -> Dict[str, int]:
+        """Drop vectors from the embedding store that neither vector store nor the FAQ index references anymore."""
+        referenced = []
+        for persist_directory in (self.angelone_vector_store_directory, self.insurance_vector_store_directory):
+            referenced.extend(self._get_collection(persist_directory).get(include=["documents"])["documents"])
+        # The FAQ fast path embeds the bare questions, which are not documents of either store.
+        faq_index_path = os.path.join(self.angelone_vector_store_directory, FAQ_INDEX_FILE)
+        if os.path.exists(faq_index_path):
+            with open(faq_index_path, 'r', encoding='utf-8') as f:
+                referenced.extend(record["question"] for record in json.load(f))
+        summary = self.embedding_store.gc(self.embeddings.model, referenced)
+        print(f"Embedding store: {summary}")
+        return summary
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the AngelOne and insurance vector stores.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Documents per embedding request")
+    parser.add_argument("--workers", type=int, default=4, help="Embedding requests in flight at once")
+    parser.add_argument("--sync", action="store_true", help="Only embed new and changed documents and delete removed ones")
+    parser.add_argument("--gc", action="store_true", help="Compact the embedding store, dropping unreferenced vectors")
+    parser.add_argument("--faq-dedup-threshold", type=float, default=0.85, help="Similarity for merging near-duplicate FAQ pairs (above 1: exact duplicates only)")
+    args = parser.parse_args()
+
     vector_store = VectorStore()
-    vector_store.create_vector_store()
\ No newline at end of file
+    vector_store.batch_size = args.batch_size
+    vector_store.max_workers = args.workers
+    vector_store.faq_dedup_threshold = args.faq_dedup_threshold
+    if args.gc:
+        vector_store.collect_garbage()
+    elif args.sync:
+        vector_store.sync()
+    else:
+        vector_store.create_vector_store()
+    if not args.gc:
+        print(f"Embedding store hits: {vector_store.embeddings.hits}, misses: {vector_store.embeddings.misses}")
\ No newline at end of file
@@ -0,0 +1,50 @@
+import numpy as np
+
+from rag.answer_cache import SemanticAnswerCache
+from rag.query_hints import QueryHintExtractor
+from rag.store_version import write_build_id
+
+PLANS = ["7350 Copper", "5000 HSA", "5000 Bronze", "2500 Gold"]
+
+
+def _cache(tmp_path, **kwargs):
+    directories = {name: str(tmp_path / name) for name in ("angelone", "insurance")}
+    return SemanticAnswerCache(directories, **kwargs), directories
+
+
+def test_similar_query_hits_and_different_query_misses(tmp_path):
+    cache, _ = _cache(tmp_path)
+    cache.put("insurance", "What is covered?", [1.0, 0.0, 0.0], "Everything.", ["plans"])
+
+    hit = cache.lookup("insurance", [0.99, 0.05, 0.0])
+    assert hit["answer"] == "Everything."
+    assert hit["similarity"] >= cache.threshold
+    assert cache.lookup("insurance", [0.0, 1.0, 0.0]) is None
+    # The same query routed to another corpus does not share the answer.
+    assert cache.lookup("angelone", [1.0, 0.0, 0.0]) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_plan_variant_queries_do_not_share_answers(tmp_path):
+    cache, _ = _cache(tmp_path)
+    hints = QueryHintExtractor(PLANS)
+    gold = "What is the deductible on the Gold plan?"
+    bronze = "What is the deductible on the Bronze plan?"
+    # The two questions embed almost identically; only their plan tells them apart.
+    cache.put("insurance", gold, [1.0, 0.0], "$2,500.", ["plans"], hints.build_scope(gold))
+
+    assert hints.build_scope(gold) != hints.build_scope(bronze)
+    assert cache.lookup("insurance", [1.0, 0.01], hints.build_scope(bronze)) is None
+    assert cache.lookup("insurance", [1.0, 0.01], hints.build_scope(gold))["answer"] == "$2,500."
+
+
+def test_rebuilt_store_drops_its_corpus_entries(tmp_path):
+    cache, directories = _cache(tmp_path, version_check_interval=0)
+    cache.put("angelone", "How do I withdraw?", [1.0, 0.0], "Use Funds.", ["faq"])
+    cache.put("insurance", "What is covered?", [0.0, 1.0], "Everything.", ["plans"])
+
+    write_build_id(directories["angelone"])
+
+    assert cache.lookup("angelone", [1.0, 0.0]) is None
+    assert cache.lookup("insurance", [0.0, 1.0])["answer"] == "Everything."
+    assert cache.stats()["size"] == 1
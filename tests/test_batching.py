@@ -0,0 +1,62 @@
+import asyncio
+
+from rag.batching import MicroBatcher
+
+
+def _recording_batcher(**kwargs):
+    batches = []
+
+    async def process(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    return MicroBatcher(process, **kwargs), batches
+
+
+def test_items_within_the_window_share_a_batch():
+    async def run():
+        batcher, batches = _recording_batcher(window_seconds=0.05, max_batch_size=32)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        return results, batches, batcher.stats()
+
+    results, batches, stats = asyncio.run(run())
+
+    assert results == [0, 10, 20, 30, 40]
+    assert batches == [[0, 1, 2, 3, 4]]
+    assert stats["batch_sizes"] == {5: 1}
+
+
+def test_full_batch_is_sent_without_waiting_for_the_window():
+    async def run():
+        # The window is far longer than the test; only the size limit can flush the batches.
+        batcher, batches = _recording_batcher(window_seconds=60, max_batch_size=3)
+        results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(6))), timeout=5)
+        return results, batches
+
+    results, batches = asyncio.run(run())
+
+    assert results == [0, 10, 20, 30, 40, 50]
+    assert batches == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_zero_window_processes_each_item_alone():
+    async def run():
+        batcher, batches = _recording_batcher(window_seconds=0)
+        await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+        return batches
+
+    assert asyncio.run(run()) == [[0], [1], [2]]
+
+
+def test_batch_error_reaches_every_caller():
+    async def process(items):
+        raise RuntimeError("embedding failed")
+
+    async def run():
+        batcher = MicroBatcher(process, window_seconds=0.01)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert [str(result) for result in results] == ["embedding failed"] * 3
+    assert all(isinstance(result, RuntimeError) for result in results)
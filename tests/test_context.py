@@ -0,0 +1,43 @@
+import tiktoken
+from langchain_core.documents import Document
+
+from rag.context import ContextPacker, approximate_token_count
+
+
+def _offline(monkeypatch):
+    def fail(*args, **kwargs):
+        raise ConnectionError("no network")
+
+    monkeypatch.setattr(tiktoken, "encoding_for_model", fail)
+    monkeypatch.setattr(tiktoken, "get_encoding", fail)
+
+
+def test_packer_falls_back_to_approximate_counts_offline(monkeypatch):
+    _offline(monkeypatch)
+    packer = ContextPacker("gpt-4.1-mini", token_budget=10)
+
+    packed = packer.pack([Document(page_content="a" * 40), Document(page_content="b" * 4)])
+
+    assert packer.encoding is None
+    assert packer.count_tokens("a" * 40) == approximate_token_count("a" * 40) == 10
+    assert [document.page_content for document in packed.documents] == ["a" * 40]
+    assert packed.over_budget_dropped == 1
+    assert packer.stats()["approximate_tokens"] is True
+
+
+def test_chunks_of_different_plans_are_not_duplicates(monkeypatch):
+    _offline(monkeypatch)
+    packer = ContextPacker("gpt-4.1-mini")
+    body = (
+        '"medical event": If you have a test\n"service": Diagnostic test (x-ray, blood work)\n'
+        '"what you will pay (in network)": 20% coinsurance\n"what you will pay (out of network)": 50% coinsurance\n'
+        '"limitations, exceptions, and other important information": Preauthorization required for imaging'
+    )
+    hsa = Document(page_content=f"Plan: 5000 HSA\n{body}", metadata={"plan": "5000 HSA"})
+    gold = Document(page_content=f"Plan: 2500 Gold\n{body}", metadata={"plan": "2500 Gold"})
+    gold_copy = Document(page_content=f"Plan: 2500 Gold\n{body}.", metadata={"plan": "2500 Gold"})
+
+    packed = packer.pack([hsa, gold, gold_copy])
+
+    assert packed.documents == [hsa, gold]
+    assert packed.duplicates_dropped == 1
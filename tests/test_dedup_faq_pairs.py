@@ -0,0 +1,63 @@
+from data_processing.dedup_faq_pairs import dedup_faq_pairs
+
+SEGMENT_ANSWER = (
+    "To activate the segment, open the Angel One app, go to Profile, tap Segments, select it "
+    "and upload your latest income proof. Activation takes up to 24 hours."
+)
+
+
+def _page(url, *pairs):
+    return {"url": url, "faq_pairs": [{"question": question, "answer": answer} for question, answer in pairs]}
+
+
+def test_exact_duplicates_collapse_into_one_entry_with_every_url():
+    pairs = [
+        ("How do I add funds?", "Use UPI or net banking from the Funds section."),
+        ("What is MTF?", "Margin Trading Facility lets you buy stocks by paying part of their value."),
+    ]
+    faq_data = [
+        _page("https://www.angelone.in/support/funds", pairs[0], pairs[1]),
+        _page("https://www.angelone.in/support/margin", pairs[1]),
+        # Case and punctuation do not matter.
+        _page("https://www.angelone.in/support/upi", ("how do i add funds", "Use UPI or net banking from the Funds section!")),
+    ]
+
+    deduped, report = dedup_faq_pairs(faq_data, threshold=1.1)
+
+    assert [entry["question"] for entry in deduped] == ["How do I add funds?", "What is MTF?"]
+    assert deduped[0]["urls"] == ["https://www.angelone.in/support/funds", "https://www.angelone.in/support/upi"]
+    assert deduped[1]["urls"] == ["https://www.angelone.in/support/funds", "https://www.angelone.in/support/margin"]
+    assert (report["pairs"], report["documents"], report["exact_duplicates"], report["near_duplicates"]) == (4, 2, 2, 0)
+
+
+def test_near_duplicates_merge_only_above_the_threshold():
+    faq_data = [
+        _page("https://www.angelone.in/support/a", ("How can I activate the currency segment?", SEGMENT_ANSWER)),
+        _page("https://www.angelone.in/support/b", ("How can I activate the currency segment?", SEGMENT_ANSWER + " Contact us.")),
+    ]
+
+    merged, report = dedup_faq_pairs(faq_data, threshold=0.85)
+    kept, _ = dedup_faq_pairs(faq_data, threshold=1.1)
+
+    assert len(merged) == 1
+    assert report["near_duplicates"] == 1
+    # The longest answer of the group is kept, with the sources of both pairs.
+    assert merged[0]["answer"].endswith("Contact us.")
+    assert merged[0]["urls"] == ["https://www.angelone.in/support/a", "https://www.angelone.in/support/b"]
+    assert len(kept) == 2
+
+
+def test_same_answer_to_different_questions_is_not_merged():
+    faq_data = [
+        _page("https://www.angelone.in/support/currency", ("How can I activate the currency segment?", SEGMENT_ANSWER)),
+        _page("https://www.angelone.in/support/commodity", ("How can I activate the commodity segment?", SEGMENT_ANSWER)),
+    ]
+
+    # The answers are identical, but the questions differ in the one word that matters.
+    deduped, report = dedup_faq_pairs(faq_data, threshold=0.85)
+
+    assert [entry["question"] for entry in deduped] == [
+        "How can I activate the currency segment?",
+        "How can I activate the commodity segment?",
+    ]
+    assert report["near_duplicates"] == 0
@@ -0,0 +1,71 @@
+import numpy as np
+
+from rag.embedding_store import EmbeddingStore, StoreBackedEmbeddings
+
+MODEL = "text-embedding-3-small"
+
+
+def test_stored_vectors_survive_reopening(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put_many(MODEL, ["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    store.put_many(MODEL, ["b", "c"], [[9.0, 9.0], [0.5, 0.5]])
+
+    reopened = EmbeddingStore(str(tmp_path))
+
+    # "b" was already stored, so its second embedding was skipped.
+    assert reopened.get_many(MODEL, ["c", "b", "missing", "a"]) == [[0.5, 0.5], [0.0, 1.0], None, [1.0, 0.0]]
+    assert reopened.get_many("other-model", ["a"]) == [None]
+
+
+def test_interrupted_append_is_ignored_and_overwritten(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put_many(MODEL, ["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    # A crash after writing a vector row and part of the next, but before their index records.
+    with open(store._path(MODEL, ".vectors"), "ab") as f:
+        f.write(np.asarray([7.0, 7.0, 7.0], dtype=np.float32).tobytes())
+    with open(store._path(MODEL, ".index"), "ab") as f:
+        f.write(EmbeddingStore.digest("x")[:10])
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert reopened.get_many(MODEL, ["a", "b", "x"]) == [[1.0, 0.0], [0.0, 1.0], None]
+    reopened.put_many(MODEL, ["c"], [[0.5, 0.5]])
+
+    again = EmbeddingStore(str(tmp_path))
+    assert again.get_many(MODEL, ["a", "b", "c"]) == [[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]]
+    assert (tmp_path / "text-embedding-3-small.vectors").stat().st_size == 3 * 2 * 4
+
+
+def test_gc_keeps_only_referenced_vectors(tmp_path):
+    store = EmbeddingStore(str(tmp_path))
+    store.put_many(MODEL, ["a", "b", "c"], [[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]])
+
+    assert store.gc(MODEL, ["c", "a"]) == {"kept": 2, "dropped": 1}
+    assert store.gc(MODEL, ["c", "a"]) == {"kept": 2, "dropped": 0}
+
+    reopened = EmbeddingStore(str(tmp_path))
+    assert reopened.get_many(MODEL, ["a", "b", "c"]) == [[1.0, 0.0], None, [0.5, 0.5]]
+    reopened.put_many(MODEL, ["d"], [[0.25, 0.75]])
+    assert EmbeddingStore(str(tmp_path)).get_many(MODEL, ["c", "d"]) == [[0.5, 0.5], [0.25, 0.75]]
+
+
+class _CountingEmbeddings:
+    model = MODEL
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_store_backed_embeddings_only_embed_missing_texts(tmp_path):
+    model = _CountingEmbeddings()
+    embeddings = StoreBackedEmbeddings(model, EmbeddingStore(str(tmp_path)))
+
+    embeddings.embed_documents(["one", "three"])
+    vectors = embeddings.embed_documents(["three", "four", "one"])
+
+    assert vectors == [[5.0, 1.0], [4.0, 1.0], [3.0, 1.0]]
+    assert model.embedded == ["one", "three", "four"]
+    assert (embeddings.hits, embeddings.misses) == (2, 3)
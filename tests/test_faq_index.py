@@ -0,0 +1,73 @@
+import numpy as np
+
+import rag.rag
+from rag.answer_cache import SemanticAnswerCache
+from rag.faq_index import FAQIndex, build_faq_index
+from rag.store_version import write_build_id
+
+
+class _FixedEmbeddings:
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[text] for text in texts]
+
+
+def _build(directory, answer):
+    faq_data = [{
+        "url": "https://www.angelone.in/support/funds",
+        "faq_pairs": [
+            {"question": "How do I add funds?", "answer": answer},
+            {"question": "What is MTF?", "answer": "Margin Trading Facility."},
+        ],
+    }]
+    embeddings = _FixedEmbeddings({"How do I add funds?": [1.0, 0.0], "What is MTF?": [0.0, 1.0]})
+    build_faq_index(faq_data, embeddings, str(directory))
+    write_build_id(str(directory))
+
+
+def test_exact_and_similar_matches(tmp_path):
+    _build(tmp_path, "Use UPI.")
+    index = FAQIndex(str(tmp_path), "angelone", threshold=0.97)
+    index.load()
+
+    assert index.lookup("how do I add funds", [0.0, 1.0])["match"] == "exact"
+    similar = index.lookup("Adding funds?", [0.99, 0.05])
+    assert (similar["answer"], similar["match"]) == ("Use UPI.", "similar")
+    assert index.lookup("Adding funds?", [0.7, 0.7]) is None
+
+
+def test_rebuilt_index_is_reloaded(tmp_path):
+    _build(tmp_path, "Use UPI.")
+    index = FAQIndex(str(tmp_path), "angelone", version_check_interval=0)
+    index.load()
+    assert index.lookup("How do I add funds?", [1.0, 0.0])["answer"] == "Use UPI."
+
+    _build(tmp_path, "Use UPI or net banking.")
+
+    assert index.lookup("How do I add funds?", [1.0, 0.0])["answer"] == "Use UPI or net banking."
+    assert index.stats()["reloads"] == 1
+
+
+def test_index_built_after_startup_is_picked_up(tmp_path):
+    index = FAQIndex(str(tmp_path), "angelone", version_check_interval=0)
+    index.load()
+    assert index.lookup("How do I add funds?", [1.0, 0.0]) is None
+
+    _build(tmp_path, "Use UPI.")
+
+    assert index.lookup("How do I add funds?", [1.0, 0.0])["answer"] == "Use UPI."
+    assert np.allclose(index.vectors, [[1.0, 0.0], [0.0, 1.0]])
+
+
+def test_fast_path_only_answers_queries_routed_to_its_corpus(tmp_path, monkeypatch):
+    _build(tmp_path, "Use UPI.")
+    index = FAQIndex(str(tmp_path), "angelone")
+    index.load()
+    monkeypatch.setattr(rag.rag, "faq_index", index)
+    monkeypatch.setattr(rag.rag, "answer_cache", SemanticAnswerCache({}))
+
+    assert rag.rag._lookupCachedAnswer("insurance", "", "How do I add funds?", [1.0, 0.0]) is None
+    answer = rag.rag._lookupCachedAnswer("angelone", "", "How do I add funds?", [1.0, 0.0])
+    assert (answer.answer, answer.answered_by) == ("Use UPI.", "faq_fast_path")
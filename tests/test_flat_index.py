@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+import pytest
+
+from rag.flat_index import FlatIndex, matches_filter
+
+PLANS = ["7350 Copper", "5000 HSA", "5000 Bronze", "2500 Gold"]
+
+
+def _write_index(directory, documents, vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    np.save(directory / "vectors.npy", vectors)
+    np.save(directory / "vectors_int8.npy", np.round(vectors / scales[:, None]).astype(np.int8))
+    np.save(directory / "scales.npy", scales.astype(np.float32))
+    with open(directory / "documents.jsonl", "w", encoding="utf-8") as f:
+        for i, (content, metadata) in enumerate(documents):
+            f.write(json.dumps({"id": str(i), "page_content": content, "metadata": metadata}) + "\n")
+    (directory / "meta.json").write_text(json.dumps({"count": len(documents)}))
+
+
+def _random_index(directory, count=400, dimension=64, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dimension))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    documents = [
+        (f"chunk {i}", {"plan": PLANS[i % 4], "type": "medical_events" if i % 3 else "important_questions"})
+        for i in range(count)
+    ]
+    documents[-1] = ("notes", {"source": "additional notes"})
+    _write_index(directory, documents, vectors)
+    return vectors, documents
+
+
+def test_int8_shortlist_finds_the_exact_neighbours(tmp_path):
+    vectors, _ = _random_index(tmp_path)
+    exact = FlatIndex(str(tmp_path))
+    quantized = FlatIndex(str(tmp_path), quantized=True, oversample=4)
+    rng = np.random.default_rng(1)
+
+    for _ in range(20):
+        query = (vectors[rng.integers(len(vectors))] + 0.1 * rng.standard_normal(vectors.shape[1])).tolist()
+        expected = exact.search(query, k=10)
+        assert expected == list(np.argsort(-(vectors @ np.asarray(query)))[:10])
+        # Re-scoring is exact, so the shortlist only has to contain the true neighbours.
+        assert quantized.search(query, k=10) == expected
+
+
+@pytest.mark.parametrize("where", [
+    {"plan": "2500 Gold"},
+    {"plan": {"$in": ["5000 HSA", "5000 Bronze"]}},
+    {"plan": {"$ne": "7350 Copper"}},
+    {"plan": {"$nin": ["7350 Copper", "2500 Gold"]}},
+    {"source": {"$eq": "additional notes"}},
+    {"$or": [{"$and": [{"plan": "2500 Gold"}, {"type": "important_questions"}]}, {"source": "additional notes"}]},
+    {"plan": "Platinum"},
+])
+def test_vectorized_filter_matches_matches_filter(tmp_path, where):
+    vectors, documents = _random_index(tmp_path)
+    index = FlatIndex(str(tmp_path))
+    expected = [row for row, (_, metadata) in enumerate(documents) if matches_filter(metadata, where)]
+
+    assert index._filter_rows(where).tolist() == expected
+    found = index.search(vectors[0].tolist(), k=5, filter=where)
+    assert all(row in expected for row in found)
+    assert len(found) == min(5, len(expected))
+
+
+def test_matches_filter_operators():
+    metadata = {"plan": "2500 Gold", "type": "others"}
+
+    assert matches_filter(metadata, {"plan": "2500 Gold", "type": "others"})
+    assert not matches_filter(metadata, {"plan": "2500 Gold", "type": "medical_events"})
+    assert matches_filter(metadata, {"$or": [{"plan": "5000 HSA"}, {"type": {"$in": ["others"]}}]})
+    assert not matches_filter(metadata, {"$and": [{"plan": {"$ne": "2500 Gold"}}, {"type": "others"}]})
+    # A missing field matches $ne and $nin, but never equality.
+    assert matches_filter(metadata, {"source": {"$nin": ["additional notes"]}})
+    assert not matches_filter(metadata, {"source": "additional notes"})
+    with pytest.raises(ValueError):
+        matches_filter(metadata, {"plan": {"$gt": "1"}})
@@ -0,0 +1,37 @@
+import json
+
+import numpy as np
+
+from rag.flat_index import FlatIndex
+from rag.query_hints import QueryHintExtractor
+
+PLANS = ["7350 Copper", "5000 HSA", "5000 Bronze", "2500 Gold"]
+
+
+def _write_index(directory, documents, vectors):
+    np.save(directory / "vectors.npy", np.asarray(vectors, dtype=np.float32))
+    with open(directory / "documents.jsonl", "w", encoding="utf-8") as f:
+        for i, (content, metadata) in enumerate(documents):
+            f.write(json.dumps({"id": str(i), "page_content": content, "metadata": metadata}) + "\n")
+    (directory / "meta.json").write_text("{}")
+
+
+def test_plan_hinted_query_still_retrieves_notes(tmp_path):
+    documents = [
+        (f"{plan} chunk {i}", {"source": "plans", "type": "important_questions", "plan": plan})
+        for plan in PLANS for i in range(4)
+    ]
+    documents.append(("Your Grievance and Appeals Rights: ...", {"source": "additional notes"}))
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((len(documents), 8))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    _write_index(tmp_path, documents, vectors)
+    index = FlatIndex(str(tmp_path))
+
+    where = QueryHintExtractor(PLANS).build_filter("How do I file an appeal on the Gold plan?")
+    # The query embedding points at the note, so the note must rank first.
+    found = index.similarity_search_by_vector(vectors[-1].tolist(), k=5, filter=where)
+
+    assert found[0].metadata == {"source": "additional notes"}
+    assert all(document.metadata.get("plan") in (None, "2500 Gold") for document in found)
+    assert sum(document.metadata.get("plan") == "2500 Gold" for document in found) == 4
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+import time
+
+import main
+import rag.rag
+from rag.single_flight import SingleFlight
+
+
+def test_do_shares_one_computation():
+    single_flight = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def run():
+        return await asyncio.gather(*(single_flight.do("key", compute) for _ in range(5)))
+
+    assert asyncio.run(run()) == [1] * 5
+    assert calls == 1
+    assert single_flight.stats()["computations_saved"] == 4
+
+
+def test_do_runs_again_once_finished():
+    single_flight = SingleFlight()
+
+    async def run():
+        first = await single_flight.do("key", lambda: asyncio.sleep(0, result="first"))
+        second = await single_flight.do("key", lambda: asyncio.sleep(0, result="second"))
+        return first, second
+
+    assert asyncio.run(run()) == ("first", "second")
+
+
+def test_stream_replays_events_to_late_subscribers():
+    single_flight = SingleFlight()
+
+    async def produce():
+        for i in range(3):
+            yield {"type": "token", "text": str(i)}
+            await asyncio.sleep(0.01)
+
+    async def consume(delay):
+        await asyncio.sleep(delay)
+        return [event["text"] async for event in single_flight.stream("key", produce)]
+
+    async def run():
+        return await asyncio.gather(consume(0), consume(0.015))
+
+    assert asyncio.run(run()) == [["0", "1", "2"], ["0", "1", "2"]]
+    assert single_flight.stats()["computations"] == 1
+
+
+def test_stream_error_reaches_every_subscriber():
+    single_flight = SingleFlight()
+
+    async def produce():
+        yield {"type": "token", "text": "partial"}
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream failed")
+
+    async def consume():
+        events = []
+        try:
+            async for event in single_flight.stream("key", produce):
+                events.append(event)
+        except RuntimeError as e:
+            return len(events), str(e)
+
+    async def run():
+        return await asyncio.gather(consume(), consume())
+
+    assert asyncio.run(run()) == [(1, "upstream failed"), (1, "upstream failed")]
+
+
+def test_call_shares_one_computation_across_threads():
+    single_flight = SingleFlight()
+    calls = 0
+    started = threading.Event()
+
+    def compute():
+        nonlocal calls
+        calls += 1
+        started.set()
+        time.sleep(0.05)
+        return "answer"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(single_flight.call("key", compute)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(single_flight.call("key", compute))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert results == ["answer"] * 4
+    assert calls == 1
+
+
+def test_concurrent_identical_streams_both_get_tokens_and_sources(monkeypatch):
+    async def fake_stream(query):
+        for text in ("Hello", " world"):
+            await asyncio.sleep(0.01)
+            yield {"type": "token", "text": text}
+        yield {"type": "sources", "corpus": "angelone", "answered_by": "llm", "sources": []}
+
+    monkeypatch.setattr(rag.rag, "_streamAnswerAsync", fake_stream)
+
+    async def request():
+        response = await main.get_answer_stream("How do I withdraw money?")
+        return "".join([chunk async for chunk in response.body_iterator])
+
+    async def run():
+        return await asyncio.gather(request(), request())
+
+    for body in asyncio.run(run()):
+        assert body.count("event: token") == 2
+        assert "event: sources" in body
+        assert "event: failed" not in body